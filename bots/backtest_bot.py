@@ -3,6 +3,8 @@
 Backtest Trading Bot - Fixed with separate settings and emojis
 """
 
+import os
+import tempfile
 import time
 import schedule
 from datetime import datetime
@@ -11,11 +13,17 @@ from core.symbol_manager import SymbolManager
 from core.position_manager import PositionManager
 from core.data_manager import DataManager
 from strategies.strategy_loader import StrategyLoader
-from utils.helpers import get_bot_settings, is_market_hours, calculate_quantity
+from utils.helpers import get_bot_settings, is_market_hours, calculate_quantity, invalidate_settings_cache
 from utils.logger import setup_logger
 from utils.trade_logger import TradeLogger
 import yaml
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 logger = setup_logger(__name__, "backtest")
 
 class BacktestBot:
@@ -24,6 +32,7 @@ class BacktestBot:
     def __init__(self):
         # Load backtest-specific settings
         self.settings = get_bot_settings('backtest')
+        self.settings_version = 0
         self.backtest_settings = self._load_backtest_specific_settings()
         
         logger.info("="*60)
@@ -63,7 +72,7 @@ class BacktestBot:
         """Load backtest-specific settings (schedule, duration, etc.)"""
         try:
             with open('config/settings.yaml', 'r') as f:
-                full_config = yaml.safe_load(f)
+                full_config = yaml.load(f, Loader=SafeLoader)
             
             backtest_config = full_config.get('backtest_bot', {})
             
@@ -96,7 +105,7 @@ class BacktestBot:
         """Save settings to config file"""
         try:
             with open('config/settings.yaml', 'r') as f:
-                full_config = yaml.safe_load(f)
+                full_config = yaml.load(f, Loader=SafeLoader)
             
             # Update backtest_bot.trading section
             if 'backtest_bot' not in full_config:
@@ -107,8 +116,16 @@ class BacktestBot:
             # Update trading settings
             full_config['backtest_bot']['trading'].update(self.settings)
             
-            with open('config/settings.yaml', 'w') as f:
-                yaml.safe_dump(full_config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            # Write a private temp file and swap it in, so readers never see a partial file
+            tmp = tempfile.NamedTemporaryFile('w', dir='config', suffix='.tmp', delete=False)
+            try:
+                with tmp:
+                    yaml.dump(full_config, tmp, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                os.replace(tmp.name, 'config/settings.yaml')
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+            invalidate_settings_cache()
             
             logger.info("✅ Settings saved to config/settings.yaml")
         except Exception as e:
@@ -117,6 +134,7 @@ class BacktestBot:
     def update_settings(self, key: str, value: Any):
         """Update a setting"""
         self.settings[key] = value
+        self.settings_version += 1
         logger.info(f"✅ Updated setting: {key} = {value}")
 
         # Recreate SymbolManager if broker changed
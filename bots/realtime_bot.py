@@ -3,6 +3,8 @@
 Realtime Trading Bot - Updated for separate settings
 """
 
+import os
+import tempfile
 import time
 import schedule
 from datetime import datetime
@@ -10,12 +12,18 @@ from typing import Dict, Any, List
 from core.symbol_manager import SymbolManager
 from core.position_manager import PositionManager
 from strategies.strategy_loader import StrategyLoader
-from utils.helpers import get_bot_settings, is_market_hours, calculate_quantity
+from utils.helpers import get_bot_settings, is_market_hours, calculate_quantity, invalidate_settings_cache
 from utils.logger import setup_logger
 from utils.trade_logger import TradeLogger
 import pandas as pd
 import yaml
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 logger = setup_logger(__name__, "realtime")
 
 class RealtimeBot:
@@ -24,6 +32,7 @@ class RealtimeBot:
     def __init__(self):
         # Load bot-specific settings
         self.settings = get_bot_settings('realtime')
+        self.settings_version = 0
         
         logger.info("="*60)
         logger.info("🚀 Initializing Realtime Bot with separate settings")
@@ -75,7 +84,7 @@ class RealtimeBot:
         try:
             # Load full config
             with open('config/settings.yaml', 'r') as f:
-                full_config = yaml.safe_load(f)
+                full_config = yaml.load(f, Loader=SafeLoader)
             
             # Update realtime_bot.trading section
             if 'realtime_bot' not in full_config:
@@ -86,9 +95,16 @@ class RealtimeBot:
             # Update trading settings
             full_config['realtime_bot']['trading'].update(self.settings)
             
-            # Save back
-            with open('config/settings.yaml', 'w') as f:
-                yaml.safe_dump(full_config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            # Save back via a private temp file swapped in, so readers never see a partial file
+            tmp = tempfile.NamedTemporaryFile('w', dir='config', suffix='.tmp', delete=False)
+            try:
+                with tmp:
+                    yaml.dump(full_config, tmp, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                os.replace(tmp.name, 'config/settings.yaml')
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+            invalidate_settings_cache()
             
             logger.info("✅ Settings saved to config/settings.yaml")
         except Exception as e:
@@ -97,6 +113,7 @@ class RealtimeBot:
     def update_settings(self, key: str, value: Any):
         """Update a setting"""
         self.settings[key] = value
+        self.settings_version += 1
         logger.info(f"✅ Updated setting: {key} = {value}")
         
         # Recreate SymbolManager if broker changed
@@ -233,11 +250,10 @@ class RealtimeBot:
                 target=signal.get('target')
             )
             
-            # Send telegram notification
+            # Send telegram notification (this runs on the trading thread, not the bot's loop)
             if self.telegram_bot:
                 try:
-                    import asyncio
-                    asyncio.create_task(self.telegram_bot.send_trade_notification(trade_data))
+                    self.telegram_bot.notify_trade(trade_data)
                 except Exception as e:
                     logger.error(f"❌ Failed to send telegram: {e}")
         else:
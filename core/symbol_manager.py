@@ -15,6 +15,8 @@ class SymbolManager:
         self.logger = setup_logger("symbol_manager", "realtime")
         self.broker = broker
         self.master_lists: Dict[str, List[Dict]] = {}
+        # cache_key -> {upper-cased symbol: first matching entry}
+        self.symbol_index: Dict[str, Dict[str, Dict]] = {}
         self.active_symbols: List[Dict[str, Any]] = []
         
     def load_master_list(self, segment: str, broker: str = None) -> bool:
@@ -46,6 +48,13 @@ class SymbolManager:
                 data = json.load(f)
                 
             self.master_lists[cache_key] = data
+            
+            # Index by symbol so lookups are a dict probe instead of a scan
+            index = {}
+            for symbol_data in data:
+                index.setdefault(symbol_data.get('symbol', '').upper(), symbol_data)
+            self.symbol_index[cache_key] = index
+            
             self.logger.info(f"✅ Loaded {len(data)} {current_broker} symbols from {segment}")
             return True
             
@@ -105,11 +114,7 @@ class SymbolManager:
             
         cache_key = f"{current_broker}_{segment}"
         
-        for symbol_data in self.master_lists[cache_key]:
-            if symbol_data.get('symbol', '').upper() == symbol.upper():
-                return symbol_data
-                
-        return None
+        return self.symbol_index[cache_key].get(symbol.upper())
     
     def add_active_symbol(self, segment: str, symbol: str, 
                          broker: str = None) -> bool:
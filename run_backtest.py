@@ -9,6 +9,8 @@ import asyncio
 import threading
 from bots.backtest_bot import BacktestBot
 from tg.bt_telegram import BacktestTelegramBot
+from tg.helpers import new_event_loop
+from utils.helpers import ensure_directories
 from utils.logger import setup_logger
 
 logger = setup_logger("launcher", "backtest")
@@ -34,8 +36,8 @@ async def run_telegram_bot(telegram_bot):
 def telegram_thread_func(telegram_bot):
     """Thread function to run telegram bot"""
     try:
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
+        # Create new event loop for this thread (uvloop when available)
+        loop = new_event_loop()
         asyncio.set_event_loop(loop)
         
         # Run telegram bot
@@ -52,6 +54,9 @@ def main():
     logger.info("=" * 60)
     
     try:
+        # Create data, log and trade directories
+        ensure_directories()
+        
         # Initialize bot
         logger.info("Initializing Backtest Bot...")
         backtest_bot = BacktestBot()
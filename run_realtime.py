@@ -8,6 +8,7 @@ import signal
 import threading
 from bots.realtime_bot import RealtimeBot
 from tg.rt_telegram import RealtimeTelegramBot
+from utils.helpers import ensure_directories
 from utils.logger import setup_logger
 
 logger = setup_logger("launcher", "realtime")
@@ -61,6 +62,9 @@ def main():
     logger.info("="*60)
     
     try:
+        # Create data, log and trade directories
+        ensure_directories()
+        
         # Start health check server in background (for Render.com)
         health_thread = threading.Thread(target=start_health_server, daemon=True)
         health_thread.start()
@@ -72,6 +76,7 @@ def main():
         
         logger.info("📱 Initializing Telegram Interface...")
         telegram_bot = RealtimeTelegramBot(realtime_bot)
+        realtime_bot.telegram_bot = telegram_bot
         
         # Register signal handlers
         signal.signal(signal.SIGINT, signal_handler)
@@ -4,7 +4,11 @@ Dynamic Strategy Loader - Load strategies as plug-and-play modules
 """
 
 import os
-import importlib.util
+import sys
+import types
+import marshal
+import hashlib
+import tempfile
 from pathlib import Path
 from typing import List, Dict, Optional
 from strategies.base_strategy import BaseStrategy
@@ -19,12 +23,75 @@ def get_logger():
         _logger = setup_logger(__name__)
     return _logger
 
+# Modules in this package that are not strategies
+_SKIP_STEMS = frozenset({'__init__', 'base_strategy', 'strategy_loader'})
+_STRATEGIES_DIR = Path(__file__).parent
+_STRATEGIES_DIR_STR = str(_STRATEGIES_DIR)
+
+def _module_key(strategy_name: str) -> str:
+    """sys.modules key for a strategy file, qualified so it cannot shadow other modules"""
+    return f"strategies.{strategy_name}"
+
+# Marshalled code objects, named <stem>-<hash of source + path + interpreter version>.pyc
+CODE_CACHE_DIR = Path.home() / ".cache" / "algo-strategies"
+
+def compile_strategy(strategy_file: Path) -> types.CodeType:
+    """
+    Compile a strategy file, reusing a cached code object when available
+    
+    Args:
+        strategy_file: Path to the strategy source file
+    
+    Returns:
+        Compiled code object
+    """
+    source = strategy_file.read_bytes()
+    
+    digest = hashlib.sha1(source)
+    digest.update(str(strategy_file).encode())
+    digest.update(repr(sys.version_info).encode())
+    stem = strategy_file.stem
+    cache_file = CODE_CACHE_DIR / f"{stem}-{digest.hexdigest()}.pyc"
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            return marshal.load(f)
+    except Exception:
+        pass
+    
+    code = compile(source, str(strategy_file), 'exec')
+    
+    # Cache is best-effort - a read-only home must not break loading
+    tmp_path = None
+    try:
+        CODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Unique temp file + rename, so a concurrent reader never sees a partial file
+        with tempfile.NamedTemporaryFile('wb', dir=CODE_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            marshal.dump(code, f)
+        os.replace(tmp_path, cache_file)
+        tmp_path = None
+        
+        # Entries for earlier versions of this file will never be read again
+        for stale in CODE_CACHE_DIR.glob(f"{stem}-*.pyc"):
+            if stale != cache_file and stale.stem.rpartition('-')[0] == stem:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    
+    return code
+
 class StrategyLoader:
     """Load and manage trading strategies dynamically"""
     
     def __init__(self):
         self.strategies: Dict[str, BaseStrategy] = {}
-        self.strategies_dir = Path(__file__).parent
+        self._name_to_file: Dict[str, str] = {}
+        self.strategies_dir = _STRATEGIES_DIR
         self.logger = get_logger()
     
     def load_all_strategies(self) -> int:
@@ -37,17 +104,18 @@ class StrategyLoader:
         count = 0
         
         # Get all Python files except base and loader
-        strategy_files = [
-            f for f in self.strategies_dir.glob("*.py")
-            if f.stem not in ['__init__', 'base_strategy', 'strategy_loader']
-        ]
+        with os.scandir(_STRATEGIES_DIR_STR) as entries:
+            strategy_stems = [
+                entry.name[:-3] for entry in entries
+                if entry.name.endswith('.py') and entry.name[:-3] not in _SKIP_STEMS
+            ]
         
-        for strategy_file in strategy_files:
+        for strategy_stem in strategy_stems:
             try:
-                if self.load_strategy(strategy_file.stem):
+                if self.load_strategy(strategy_stem):
                     count += 1
             except Exception as e:
-                self.logger.error(f"Error loading strategy {strategy_file.stem}: {e}")
+                self.logger.error(f"Error loading strategy {strategy_stem}: {e}")
         
         self.logger.info(f"Loaded {count} strategies")
         return count
@@ -69,10 +137,20 @@ class StrategyLoader:
             return False
         
         try:
-            # Import module dynamically
-            spec = importlib.util.spec_from_file_location(strategy_name, strategy_file)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # Reuse the already-executed module if its source is unchanged
+            source_mtime = strategy_file.stat().st_mtime_ns
+            module_key = _module_key(strategy_name)
+            module = sys.modules.get(module_key)
+            
+            if (getattr(module, '__file__', None) != str(strategy_file) or
+                    getattr(module, '__source_mtime__', None) != source_mtime):
+                # Build module from (cached) code object
+                module = types.ModuleType(module_key)
+                module.__package__ = 'strategies'
+                module.__file__ = str(strategy_file)
+                module.__source_mtime__ = source_mtime
+                exec(compile_strategy(strategy_file), module.__dict__)
+                sys.modules[module_key] = module
             
             # Find BaseStrategy subclass
             strategy_class = None
@@ -91,6 +169,7 @@ class StrategyLoader:
             # Instantiate strategy
             strategy_instance = strategy_class()
             self.strategies[strategy_instance.name] = strategy_instance
+            self._name_to_file[strategy_instance.name] = strategy_name
             
             self.logger.info(f"Loaded strategy: {strategy_instance.name}")
             return True
@@ -129,11 +208,13 @@ class StrategyLoader:
         Returns:
             True if reloaded successfully
         """
-        # Find the file name
-        for file_name, strategy in self.strategies.items():
-            if strategy.name == strategy_name:
-                del self.strategies[strategy_name]
-                return self.load_strategy(file_name)
+        # Strategies are keyed by display name, files by stem
+        file_stem = self._name_to_file.get(strategy_name)
+        if file_stem:
+            self.strategies.pop(strategy_name, None)
+            # Drop the module so the file is executed again
+            sys.modules.pop(_module_key(file_stem), None)
+            return self.load_strategy(file_stem)
         
         self.logger.warning(f"Strategy {strategy_name} not found for reload")
         return False
\ No newline at end of file
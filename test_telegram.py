@@ -7,6 +7,41 @@ import asyncio
 import yaml
 from telegram import Bot
 
+async def check_bot(title: str, label: str, tg_config: dict) -> list:
+    """Test one bot, returning its report lines"""
+    lines = [f"\n{title}"]
+    token = tg_config['bot_token']
+    
+    # Get chat IDs
+    if 'chat_ids' in tg_config:
+        chat_ids = tg_config['chat_ids']
+    else:
+        chat_ids = [tg_config['chat_id']]
+    
+    lines.append(f"   Token: {token[:10]}...")
+    lines.append(f"   Chat IDs: {chat_ids}")
+    
+    # Create bot
+    bot = Bot(token=token)
+    
+    # Get bot info
+    me = await bot.get_me()
+    lines.append(f"   Bot: @{me.username} ({me.first_name})")
+    
+    # Send test messages to all chats concurrently
+    results = await asyncio.gather(
+        *(bot.send_message(chat_id=chat_id, text=f"[TEST] {label} bot is working!")
+          for chat_id in chat_ids),
+        return_exceptions=True
+    )
+    for chat_id, result in zip(chat_ids, results):
+        if isinstance(result, Exception):
+            lines.append(f"   [ERROR] Failed to send to {chat_id}: {result}")
+        else:
+            lines.append(f"   [OK] Sent to {chat_id}")
+    
+    return lines
+
 async def test_telegram():
     """Test telegram configuration"""
     print("=" * 60)
@@ -18,64 +53,13 @@ async def test_telegram():
         with open('config/secrets.yaml', 'r') as f:
             config = yaml.safe_load(f)
         
-        # Test realtime bot
-        print("\n1. Testing Realtime Bot...")
-        rt_config = config['telegram']['realtime']
-        rt_token = rt_config['bot_token']
-        
-        # Get chat IDs
-        if 'chat_ids' in rt_config:
-            rt_chat_ids = rt_config['chat_ids']
-        else:
-            rt_chat_ids = [rt_config['chat_id']]
-        
-        print(f"   Token: {rt_token[:10]}...")
-        print(f"   Chat IDs: {rt_chat_ids}")
-        
-        # Create bot
-        rt_bot = Bot(token=rt_token)
-        
-        # Get bot info
-        me = await rt_bot.get_me()
-        print(f"   Bot: @{me.username} ({me.first_name})")
-        
-        # Send test messages
-        for chat_id in rt_chat_ids:
-            try:
-                msg = await rt_bot.send_message(
-                    chat_id=chat_id,
-                    text="[TEST] Realtime bot is working!"
-                )
-                print(f"   [OK] Sent to {chat_id}")
-            except Exception as e:
-                print(f"   [ERROR] Failed to send to {chat_id}: {e}")
-        
-        # Test backtest bot
-        print("\n2. Testing Backtest Bot...")
-        bt_config = config['telegram']['backtest']
-        bt_token = bt_config['bot_token']
-        
-        if 'chat_ids' in bt_config:
-            bt_chat_ids = bt_config['chat_ids']
-        else:
-            bt_chat_ids = [bt_config['chat_id']]
-        
-        print(f"   Token: {bt_token[:10]}...")
-        print(f"   Chat IDs: {bt_chat_ids}")
-        
-        bt_bot = Bot(token=bt_token)
-        me = await bt_bot.get_me()
-        print(f"   Bot: @{me.username} ({me.first_name})")
-        
-        for chat_id in bt_chat_ids:
-            try:
-                msg = await bt_bot.send_message(
-                    chat_id=chat_id,
-                    text="[TEST] Backtest bot is working!"
-                )
-                print(f"   [OK] Sent to {chat_id}")
-            except Exception as e:
-                print(f"   [ERROR] Failed to send to {chat_id}: {e}")
+        # Test both bots concurrently
+        reports = await asyncio.gather(
+            check_bot("1. Testing Realtime Bot...", "Realtime", config['telegram']['realtime']),
+            check_bot("2. Testing Backtest Bot...", "Backtest", config['telegram']['backtest'])
+        )
+        for lines in reports:
+            print("\n".join(lines))
         
         print("\n" + "=" * 60)
         print("[SUCCESS] All tests passed!")
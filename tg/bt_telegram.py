@@ -4,14 +4,278 @@ Backtest Bot Telegram Interface - FIXED VERSION
 """
 
 import asyncio
+import html
+import shutil
+import signal
+import time
+import warnings
+import weakref
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from pathlib import Path
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, TelegramError
+from telegram.request import HTTPXRequest
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 from typing import Dict, Any
+from tg.helpers import run_in_new_loop
 from utils.helpers import load_secrets, format_pnl, format_number
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__, "backtest")
 
+# orjson decodes getUpdates batches several times faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonRequest(HTTPXRequest):
+    """HTTPXRequest that decodes Telegram responses with orjson when available"""
+    
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> Dict[str, Any]:
+        if orjson is None:
+            return HTTPXRequest.parse_json_payload(payload)
+        
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError as exc:
+            raise TelegramError("Invalid server response") from exc
+
+def _escape(value: Any) -> str:
+    """HTML-escape a value for interpolation into an HTML message"""
+    return html.escape(str(value))
+
+def _looks_like_number(value: str) -> bool:
+    """Check for a plain decimal number such as 100000, 2500.50 or -10"""
+    return value.lstrip('-').replace('.', '', 1).isdecimal() and value.count('-') <= 1
+
+@lru_cache(maxsize=1)
+def _cached_secrets() -> Dict[str, Any]:
+    """Load secrets once per process"""
+    return load_secrets()
+
+# Notifications queued close together are coalesced into one message
+_NOTIFY_SEPARATOR = "\n\n---\n\n"
+_NOTIFY_BATCH_SIZE = 20
+_MAX_MESSAGE_LENGTH = 4096
+
+# At most one error reply per chat in this many seconds
+_ERROR_REPLY_INTERVAL = 30.0
+_ERROR_BUCKET_PRUNE_SIZE = 256
+
+# Room left under the 4096 character limit for HTML entities
+_LIST_CHUNK_LENGTH = 3900
+
+# Backtest progress, cleared by the reset action
+_STATE_DIR = Path('data/backtest_state')
+
+# Number of rendered messages remembered for no-op edit detection
+_RENDER_CACHE_SIZE = 1024
+
+# Static message texts and format templates
+_MAIN_MENU_TEXT = (
+    "🤖 <b>ALGO BY GUGAN - Backtest Bot</b>\n\n"
+    "Automated historical data backtesting\n"
+    "Running 4-month sessions daily from 6 AM to 12 PM IST\n\n"
+    "Select an option below:"
+)
+
+_SETTINGS_TEXT_FMT = (
+    "⚙️ <b>Backtest Settings</b>\n\n"
+    "🏦 Broker: <code>{broker}</code>\n"
+    "📝 Segment: <code>{segment}</code>\n"
+    "💰 Capital: <code>{capital}</code>\n"
+    "⚠️ Risk: <code>{risk}%</code>\n"
+    "🔢 Max Trades: <code>{max_trades}</code>\n"
+    "📊 Active Strategies: <code>{strat_count}</code>\n"
+    "📈 Active Symbols: <code>{sym_count}</code>\n\n"
+    "<i>Backtest processes 4 months of data per day</i>"
+)
+
+_STATS_TEXT_FMT = (
+    "📊 <b>Backtest Statistics</b>\n\n"
+    "<b>Total Trades:</b> <code>{total_trades}</code>\n"
+    "<b>Total PnL:</b> {pnl}\n\n"
+    "<b>Win Rate:</b> <code>{win_rate:.2f}%</code>\n"
+    "<b>Winning Trades:</b> <code>{winning_trades}</code>\n"
+    "<b>Losing Trades:</b> <code>{losing_trades}</code>\n\n"
+    "<i>Statistics from all completed backtest sessions</i>"
+)
+
+_RESET_CONFIRM_TEXT = (
+    "⚠️ <b>Reset Backtest State</b>\n\n"
+    "This will:\n"
+    "• Clear all backtest progress\n"
+    "• Start from the beginning date\n"
+    "• Re-run all historical data\n\n"
+    "Are you sure?"
+)
+
+_RESET_DONE_TEXT = "✅ <b>Backtest state reset successfully</b>\n\nWill start from beginning on next run."
+
+_RESET_FAILED_TEXT_FMT = "❌ <b>Failed to reset state</b>\n\nError: {error}"
+
+_SYMBOL_HELP_TEXT_FMT = (
+    "📝 <b>Symbol Selection</b>\n\n"
+    "To add symbols:\n"
+    "1. Use command: <code>/addsymbol SEGMENT SYMBOL</code>\n"
+    "   Example: <code>/addsymbol NSE_FO NIFTY24JANFUT</code>\n\n"
+    "2. To remove: <code>/removesymbol SYMBOL</code>\n"
+    "   Example: <code>/removesymbol NIFTY24JANFUT</code>\n\n"
+    "3. To list active: <code>/listsymbols</code>\n\n"
+    "Currently active symbols: {sym_count}"
+)
+
+_BROKER_TEXT_FMT = (
+    "🏦 <b>Broker Selection</b>\n\n"
+    "Current broker: <code>{broker}</code>\n\n"
+    "Select a broker:"
+)
+
+_CAPITAL_TEXT_FMT = (
+    "💰 <b>Capital Setting</b>\n\n"
+    "Current capital: {capital}\n\n"
+    "To change capital, use command:\n"
+    "<code>/setcapital AMOUNT</code>\n\n"
+    "Example: <code>/setcapital 100000</code>"
+)
+
+_RISK_TEXT_FMT = (
+    "⚠️ <b>Risk per Trade</b>\n\n"
+    "Current risk: <code>{risk}%</code>\n\n"
+    "Select risk percentage:"
+)
+
+_MAXTRADES_TEXT_FMT = (
+    "🔢 <b>Maximum Trades</b>\n\n"
+    "Current limit: <code>{max_trades}</code>\n\n"
+    "Select maximum simultaneous trades:"
+)
+
+_ADD_SYMBOL_USAGE = (
+    "Usage: <code>/addsymbol SEGMENT SYMBOL</code>\n"
+    "Example: <code>/addsymbol NSE_FO NIFTY24JANFUT</code>"
+)
+
+_REMOVE_SYMBOL_USAGE = (
+    "Usage: <code>/removesymbol SYMBOL</code>\n"
+    "Example: <code>/removesymbol NIFTY24JANFUT</code>"
+)
+
+_SET_CAPITAL_USAGE = (
+    "Usage: <code>/setcapital AMOUNT</code>\n"
+    "Example: <code>/setcapital 100000</code>"
+)
+
+_SYM_ADDED = (
+    "✅ Added symbol: <code>{symbol}</code> from <code>{segment}</code>\n"
+    "Total active symbols: {count}"
+)
+
+_SYM_ADD_FAIL = (
+    "❌ Failed to add symbol: <code>{symbol}</code>\n"
+    "Make sure the segment and symbol are correct."
+)
+
+_SYM_REMOVED = (
+    "✅ Removed symbol: <code>{symbol}</code>\n"
+    "Total active symbols: {count}"
+)
+
+_SYM_REMOVE_FAIL = "❌ Symbol not found: <code>{symbol}</code>"
+
+_STRATEGIES_TEXT_FMT = (
+    "📊 <b>Strategy Selection</b>\n\n"
+    "Active strategies: {strat_count}\n\n"
+    "Click to toggle strategies:"
+)
+
+# Static keyboards, built once and shared by every callback
+_MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
+    [InlineKeyboardButton("📊 Stats", callback_data="stats")],
+    [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
+])
+
+_SETTINGS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Segment/Symbols", callback_data="set_symbols")],
+    [InlineKeyboardButton("🏦 Broker", callback_data="set_broker")],
+    [InlineKeyboardButton("💰 Capital", callback_data="set_capital")],
+    [InlineKeyboardButton("⚠️ Risk", callback_data="set_risk")],
+    [InlineKeyboardButton("🔢 Max Trades", callback_data="set_max_trades")],
+    [InlineKeyboardButton("📊 Strategies", callback_data="set_strategies")],
+    [InlineKeyboardButton("🔄 Reset State", callback_data="reset_state")],
+    [InlineKeyboardButton("« Back", callback_data="main_menu")]
+])
+
+_BACK_TO_MAIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="main_menu")]])
+
+_BACK_TO_SETTINGS_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="settings")]])
+
+_RESET_CONFIRM_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, Reset", callback_data="reset_confirmed")],
+    [InlineKeyboardButton("❌ Cancel", callback_data="settings")]
+])
+
+_BROKER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("AngelOne", callback_data="broker_angelone")],
+    [InlineKeyboardButton("Zerodha", callback_data="broker_zerodha")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+_RISK_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("1%", callback_data="risk_1")],
+    [InlineKeyboardButton("2%", callback_data="risk_2")],
+    [InlineKeyboardButton("3%", callback_data="risk_3")],
+    [InlineKeyboardButton("5%", callback_data="risk_5")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+_MAXTRADES_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("3", callback_data="maxtrades_3")],
+    [InlineKeyboardButton("5", callback_data="maxtrades_5")],
+    [InlineKeyboardButton("8", callback_data="maxtrades_8")],
+    [InlineKeyboardButton("10", callback_data="maxtrades_10")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+# Symbol and capital help screens only offer a way back to settings
+_SYMBOL_HELP_MARKUP = _BACK_TO_SETTINGS_MARKUP
+_CAPITAL_HELP_MARKUP = _BACK_TO_SETTINGS_MARKUP
+
+# strategy_<key> callback suffix -> strategy name
+_STRATEGY_KEYS = {
+    "5ema": "5EMA_PowerOfStocks",
+    "sma": "SMA_Crossover"
+}
+
+# Strategy toggle keyboards for every (5EMA enabled, SMA enabled) combination
+_STRATEGIES_MARKUPS: Dict[tuple, InlineKeyboardMarkup] = {
+    (ema_on, sma_on): InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            f"{'✅' if ema_on else '☐'} 5 EMA Power of Stocks",
+            callback_data="strategy_5ema"
+        )],
+        [InlineKeyboardButton(
+            f"{'✅' if sma_on else '☐'} SMA Crossover",
+            callback_data="strategy_sma"
+        )],
+        [InlineKeyboardButton("« Back", callback_data="settings")]
+    ])
+    for ema_on in (False, True)
+    for sma_on in (False, True)
+}
+
+def _strategies_markup(active_strategies) -> InlineKeyboardMarkup:
+    """Get the strategy toggle keyboard for the given active strategies"""
+    return _STRATEGIES_MARKUPS[(
+        '5EMA_PowerOfStocks' in active_strategies,
+        'SMA_Crossover' in active_strategies
+    )]
+
 class BacktestTelegramBot:
     """Telegram interface for Backtest Bot"""
     
@@ -23,549 +287,672 @@ class BacktestTelegramBot:
             bot_controller: Reference to main bot controller
         """
         self.bot_controller = bot_controller
-        secrets = load_secrets()
-        self.token = secrets['telegram']['backtest']['bot_token']
-        self.chat_ids = secrets['telegram']['backtest']['chat_ids']
         self.app = None
+        
+        # Settings snapshot, refreshed when the controller's version changes
+        self._settings_cache = None
+        self._settings_ver = -1
+        
+        # Set to stop start_async; created per run on the running loop
+        self._stop_event = None
+        
+        # Notification queue and its worker, created in start_async
+        self._notify_q = None
+        self._notify_task = None
+        
+        # (chat_id, message_id) -> hash of the last rendered text and markup
+        self._last_render = OrderedDict()
+        
+        # Callback routing: exact callback_data, then "<prefix>_<arg>"
+        self._exact = {
+            "settings": self.settings_menu,
+            "stats": self.stats_menu,
+            "reset_state": self.reset_state_confirm,
+            "reset_confirmed": self.reset_state_execute,
+            "main_menu": self.show_main_menu,
+            "refresh": self.show_main_menu,
+            "set_symbols": self.set_symbols_menu,
+            "set_broker": self.set_broker_menu,
+            "set_capital": self.set_capital_menu,
+            "set_risk": self.set_risk_menu,
+            "set_max_trades": self.set_max_trades_menu,
+            "set_strategies": self.set_strategies_menu
+        }
+        self._prefix = {
+            "risk": self._apply_risk,
+            "maxtrades": self._apply_maxtrades,
+            "broker": self._apply_broker,
+            "strategy": self._toggle_strategy
+        }
+        
+        # chat_id -> monotonic time before which no error reply is sent
+        self._err_bucket: Dict[int, float] = {}
+        
+        # Per-chat locks keep callbacks ordered within a chat only
+        self._chat_locks = weakref.WeakValueDictionary()
+        
+        # Serializes settings changes across all chats; created in start_async
+        self._settings_lock = None
+    
+    @cached_property
+    def telegram_config(self) -> Dict[str, Any]:
+        """Backtest telegram secrets, loaded on first use"""
+        return _cached_secrets()['telegram']['backtest']
+    
+    @property
+    def token(self) -> str:
+        """Bot token"""
+        return self.telegram_config['bot_token']
+    
+    @property
+    def chat_ids(self) -> list:
+        """Chat IDs to notify"""
+        return self.telegram_config['chat_ids']
+    
+    def _get_settings(self) -> Dict[str, Any]:
+        """Get controller settings, refetching only after they were updated"""
+        version = self.bot_controller.settings_version
+        if version != self._settings_ver:
+            self._settings_cache = self.bot_controller.get_settings()
+            self._settings_ver = version
+        return self._settings_cache
+    
+    async def _update(self, key: str, value: Any):
+        """Update a controller setting without blocking the event loop on disk I/O"""
+        async with self._settings_lock:
+            await asyncio.to_thread(self.bot_controller.update_settings, key, value)
+    
+    async def _render(self, query, text: str, reply_markup: InlineKeyboardMarkup,
+                      answered: bool = False):
+        """
+        Answer the callback and edit its message concurrently
+        
+        The edit is skipped when it would not change the message. Pass
+        answered=True when the caller already answered the callback.
+        """
+        key = (query.message.chat_id, query.message.message_id)
+        # Markups compare and hash by their buttons, not by identity
+        content_hash = hash((text, reply_markup))
+        unchanged = self._last_render.get(key) == content_hash
+        
+        calls = [] if answered else [query.answer()]
+        if not unchanged:
+            calls.append(query.edit_message_text(text, reply_markup=reply_markup))
+        
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        edit_failed = False
+        for result in results:
+            if isinstance(result, BadRequest):
+                # Not modified means the message already shows this content
+                if "not modified" in str(result).lower():
+                    continue
+                logger.warning("Telegram rejected menu update: %s", result)
+                edit_failed = edit_failed or result is results[-1]
+            elif isinstance(result, Exception):
+                raise result
+        
+        if unchanged or edit_failed:
+            return
+        
+        self._last_render[key] = content_hash
+        self._last_render.move_to_end(key)
+        if len(self._last_render) > _RENDER_CACHE_SIZE:
+            self._last_render.popitem(last=False)
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
-        keyboard = [
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-            [InlineKeyboardButton("📊 Stats", callback_data="stats")],
-            [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _MAIN_MENU_MARKUP
         
-        message = (
-            "🤖 *ALGO BY GUGAN - Backtest Bot*\n\n"
-            "Automated historical data backtesting\n"
-            "Running 4-month sessions daily from 6 AM to 12 PM IST\n\n"
-            "Select an option below:"
-        )
+        message = _MAIN_MENU_TEXT
         
-        await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await update.message.reply_text(message, reply_markup=reply_markup)
     
-    async def settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            answered: bool = False):
         """Display settings menu"""
         query = update.callback_query
-        await query.answer()
-        
-        keyboard = [
-            [InlineKeyboardButton("📝 Segment/Symbols", callback_data="set_symbols")],
-            [InlineKeyboardButton("🏦 Broker", callback_data="set_broker")],
-            [InlineKeyboardButton("💰 Capital", callback_data="set_capital")],
-            [InlineKeyboardButton("⚠️ Risk", callback_data="set_risk")],
-            [InlineKeyboardButton("🔢 Max Trades", callback_data="set_max_trades")],
-            [InlineKeyboardButton("📊 Strategies", callback_data="set_strategies")],
-            [InlineKeyboardButton("🔄 Reset State", callback_data="reset_state")],
-            [InlineKeyboardButton("« Back", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        settings = self.bot_controller.get_settings()
         
-        message = (
-            "⚙️ *Backtest Settings*\n\n"
-            f"🏦 Broker: `{settings['broker']}`\n"
-            f"📝 Segment: `{settings['segment']}`\n"
-            f"💰 Capital: `{format_number(settings['capital'])}`\n"
-            f"⚠️ Risk: `{settings['risk_per_trade']}%`\n"
-            f"🔢 Max Trades: `{settings['max_trades']}`\n"
-            f"📊 Active Strategies: `{len(settings['active_strategies'])}`\n"
-            f"📈 Active Symbols: `{len(settings['active_symbols'])}`\n\n"
-            "_Backtest processes 4 months of data per day_"
+        reply_markup = _SETTINGS_MARKUP
+        
+        settings = self._get_settings()
+        
+        message = _SETTINGS_TEXT_FMT.format(
+            broker=_escape(settings['broker']),
+            segment=_escape(settings['segment']),
+            capital=format_number(settings['capital']),
+            risk=settings['risk_per_trade'],
+            max_trades=settings['max_trades'],
+            strat_count=len(settings['active_strategies']),
+            sym_count=len(settings['active_symbols'])
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup, answered)
     
     async def stats_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Display statistics"""
         query = update.callback_query
-        await query.answer()
         
-        stats = self.bot_controller.get_stats()
+        stats = await asyncio.to_thread(self.bot_controller.get_stats)
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_MAIN_MARKUP
         
-        message = (
-            "📊 *Backtest Statistics*\n\n"
-            f"*Total Trades:* `{stats['total_trades']}`\n"
-            f"*Total PnL:* {format_pnl(stats['total_pnl'])}\n\n"
-            f"*Win Rate:* `{stats['win_rate']:.2f}%`\n"
-            f"*Winning Trades:* `{stats['winning_trades']}`\n"
-            f"*Losing Trades:* `{stats['losing_trades']}`\n\n"
-            "_Statistics from all completed backtest sessions_"
-        )
+        message = _STATS_TEXT_FMT.format(pnl=format_pnl(stats['total_pnl']), **stats)
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def reset_state_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Confirm reset backtest state"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [
-            [InlineKeyboardButton("✅ Yes, Reset", callback_data="reset_confirmed")],
-            [InlineKeyboardButton("❌ Cancel", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _RESET_CONFIRM_MARKUP
         
-        message = (
-            "⚠️ *Reset Backtest State*\n\n"
-            "This will:\n"
-            "• Clear all backtest progress\n"
-            "• Start from the beginning date\n"
-            "• Re-run all historical data\n\n"
-            "Are you sure?"
-        )
+        message = _RESET_CONFIRM_TEXT
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def reset_state_execute(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Execute reset backtest state"""
         query = update.callback_query
-        await query.answer()
         
         # Reset state for all symbols and strategies
         try:
-            import shutil
-            from pathlib import Path
-            
-            state_dir = Path('data/backtest_state')
-            if state_dir.exists():
-                shutil.rmtree(state_dir)
-                state_dir.mkdir(parents=True, exist_ok=True)
+            if _STATE_DIR.exists():
+                # Deleting many session files would otherwise stall the event loop
+                await asyncio.to_thread(shutil.rmtree, _STATE_DIR)
+                await asyncio.to_thread(_STATE_DIR.mkdir, parents=True, exist_ok=True)
                 
-            keyboard = [[InlineKeyboardButton("« Back", callback_data="main_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = _BACK_TO_MAIN_MARKUP
             
-            message = "✅ *Backtest state reset successfully*\n\nWill start from beginning on next run."
+            message = _RESET_DONE_TEXT
         except Exception as e:
-            keyboard = [[InlineKeyboardButton("« Back", callback_data="settings")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = _BACK_TO_SETTINGS_MARKUP
             
-            message = f"❌ *Failed to reset state*\n\nError: {str(e)}"
+            message = _RESET_FAILED_TEXT_FMT.format(error=html.escape(str(e)))
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle button callbacks"""
+        """Handle button callbacks, serialized per chat"""
+        chat_id = update.effective_chat.id
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_id] = lock
+        
+        async with lock:
+            await self._dispatch(update, context)
+    
+    async def _dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Route a button callback to its handler"""
         query = update.callback_query
         data = query.data
         
-        if data == "settings":
-            await self.settings_menu(update, context)
-        elif data == "stats":
-            await self.stats_menu(update, context)
-        elif data == "reset_state":
-            await self.reset_state_confirm(update, context)
-        elif data == "reset_confirmed":
-            await self.reset_state_execute(update, context)
-        elif data == "main_menu" or data == "refresh":
-            await self.show_main_menu(update, context)
-        elif data == "set_symbols":
-            await self.set_symbols_menu(update, context)
-        elif data == "set_broker":
-            await self.set_broker_menu(update, context)
-        elif data == "set_capital":
-            await self.set_capital_menu(update, context)
-        elif data == "set_risk":
-            await self.set_risk_menu(update, context)
-        elif data == "set_max_trades":
-            await self.set_max_trades_menu(update, context)
-        elif data == "set_strategies":
-            await self.set_strategies_menu(update, context)
-        elif data.startswith("risk_"):
-            risk_value = data.split("_")[1]
-            self.bot_controller.update_settings('risk_per_trade', float(risk_value))
-            await query.answer(f"Risk set to {risk_value}%", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("maxtrades_"):
-            max_trades = int(data.split("_")[1])
-            self.bot_controller.update_settings('max_trades', max_trades)
-            await query.answer(f"Max trades set to {max_trades}", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("broker_"):
-            broker = data.split("_")[1]
-            self.bot_controller.update_settings('broker', broker)
-            await query.answer(f"Broker set to {broker}", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("strategy_"):
-            strategy_name = "5EMA_PowerOfStocks" if data == "strategy_5ema" else "SMA_Crossover"
-            current_strategies = self.bot_controller.get_settings()['active_strategies']
-            if strategy_name in current_strategies:
-                current_strategies.remove(strategy_name)
-                await query.answer(f"Disabled {strategy_name}", show_alert=False)
-            else:
-                current_strategies.append(strategy_name)
-                await query.answer(f"Enabled {strategy_name}", show_alert=False)
-            self.bot_controller.update_settings('active_strategies', current_strategies)
-            await self.set_strategies_menu(update, context)
-        else:
-            await query.answer("Feature coming soon!", show_alert=True)
+        handler = self._exact.get(data)
+        if handler:
+            return await handler(update, context)
+        
+        prefix, _, arg = data.partition("_")
+        handler = self._prefix.get(prefix)
+        if handler:
+            return await handler(arg, update, context)
+        
+        await query.answer("Feature coming soon!", show_alert=True)
+    
+    async def _apply_risk(self, risk_value: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle risk_<percent> callbacks"""
+        await self._update('risk_per_trade', float(risk_value))
+        await asyncio.gather(
+            update.callback_query.answer(f"Risk set to {risk_value}%", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _apply_maxtrades(self, value: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle maxtrades_<count> callbacks"""
+        max_trades = int(value)
+        await self._update('max_trades', max_trades)
+        await asyncio.gather(
+            update.callback_query.answer(f"Max trades set to {max_trades}", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _apply_broker(self, broker: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle broker_<name> callbacks"""
+        await self._update('broker', broker)
+        await asyncio.gather(
+            update.callback_query.answer(f"Broker set to {broker}", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _toggle_strategy(self, key: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle strategy_<key> callbacks"""
+        query = update.callback_query
+        strategy_name = _STRATEGY_KEYS.get(key, "SMA_Crossover")
+        
+        # Read and write under the lock so concurrent toggles are not lost
+        async with self._settings_lock:
+            active_strategies = set(self._get_settings()['active_strategies'])
+            active_strategies ^= {strategy_name}
+            # Settings are persisted to YAML, so store a plain list
+            await asyncio.to_thread(
+                self.bot_controller.update_settings, 'active_strategies', sorted(active_strategies)
+            )
+        state = "Enabled" if strategy_name in active_strategies else "Disabled"
+        await asyncio.gather(
+            query.answer(f"{state} {strategy_name}", show_alert=False),
+            self.set_strategies_menu(update, context, answered=True)
+        )
     
     async def set_symbols_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Symbol selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="settings")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _SYMBOL_HELP_MARKUP
         
-        message = (
-            "📝 *Symbol Selection*\n\n"
-            "To add symbols:\n"
-            "1. Use command: `/addsymbol SEGMENT SYMBOL`\n"
-            "   Example: `/addsymbol NSE_FO NIFTY24JANFUT`\n\n"
-            "2. To remove: `/removesymbol SYMBOL`\n"
-            "   Example: `/removesymbol NIFTY24JANFUT`\n\n"
-            "3. To list active: `/listsymbols`\n\n"
-            f"Currently active symbols: {len(self.bot_controller.get_settings()['active_symbols'])}"
+        message = _SYMBOL_HELP_TEXT_FMT.format(
+            sym_count=len(self._get_settings()['active_symbols'])
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_broker_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Broker selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("AngelOne", callback_data="broker_angelone")],
-            [InlineKeyboardButton("Zerodha", callback_data="broker_zerodha")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BROKER_MARKUP
         
-        message = (
-            f"🏦 *Broker Selection*\n\n"
-            f"Current broker: `{settings['broker']}`\n\n"
-            "Select a broker:"
-        )
+        message = _BROKER_TEXT_FMT.format(broker=_escape(settings['broker']))
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_capital_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Capital setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="settings")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _CAPITAL_HELP_MARKUP
         
-        message = (
-            f"💰 *Capital Setting*\n\n"
-            f"Current capital: {format_number(settings['capital'])}\n\n"
-            "To change capital, use command:\n"
-            "`/setcapital AMOUNT`\n\n"
-            "Example: `/setcapital 100000`"
-        )
+        message = _CAPITAL_TEXT_FMT.format(capital=format_number(settings['capital']))
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_risk_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Risk setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("1%", callback_data="risk_1")],
-            [InlineKeyboardButton("2%", callback_data="risk_2")],
-            [InlineKeyboardButton("3%", callback_data="risk_3")],
-            [InlineKeyboardButton("5%", callback_data="risk_5")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _RISK_MARKUP
         
-        message = (
-            f"⚠️ *Risk per Trade*\n\n"
-            f"Current risk: `{settings['risk_per_trade']}%`\n\n"
-            "Select risk percentage:"
-        )
+        message = _RISK_TEXT_FMT.format(risk=settings['risk_per_trade'])
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_max_trades_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Max trades setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("3", callback_data="maxtrades_3")],
-            [InlineKeyboardButton("5", callback_data="maxtrades_5")],
-            [InlineKeyboardButton("8", callback_data="maxtrades_8")],
-            [InlineKeyboardButton("10", callback_data="maxtrades_10")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _MAXTRADES_MARKUP
         
-        message = (
-            f"🔢 *Maximum Trades*\n\n"
-            f"Current limit: `{settings['max_trades']}`\n\n"
-            "Select maximum simultaneous trades:"
-        )
+        message = _MAXTRADES_TEXT_FMT.format(max_trades=settings['max_trades'])
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
-    async def set_strategies_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def set_strategies_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                  answered: bool = False):
         """Strategy selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         active_strategies = settings['active_strategies']
         
-        keyboard = [
-            [InlineKeyboardButton(
-                f"{'✅' if '5EMA_PowerOfStocks' in active_strategies else '☐'} 5 EMA Power of Stocks",
-                callback_data="strategy_5ema"
-            )],
-            [InlineKeyboardButton(
-                f"{'✅' if 'SMA_Crossover' in active_strategies else '☐'} SMA Crossover",
-                callback_data="strategy_sma"
-            )],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _strategies_markup(active_strategies)
         
-        message = (
-            f"📊 *Strategy Selection*\n\n"
-            f"Active strategies: {len(active_strategies)}\n\n"
-            "Click to toggle strategies:"
-        )
+        message = _STRATEGIES_TEXT_FMT.format(strat_count=len(active_strategies))
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup, answered)
     
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show main menu (for callback queries)"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-            [InlineKeyboardButton("📊 Stats", callback_data="stats")],
-            [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _MAIN_MENU_MARKUP
         
-        message = (
-            "🤖 *ALGO BY GUGAN - Backtest Bot*\n\n"
-            "Automated historical data backtesting\n"
-            "Running 4-month sessions daily from 6 AM to 12 PM IST\n\n"
-            "Select an option below:"
-        )
+        message = _MAIN_MENU_TEXT
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def send_notification(self, message: str):
-        """Send notification message"""
-        try:
-            await self.app.bot.send_message(
-                chat_ids=self.chat_ids,
-                text=message,
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            logger.error(f"Failed to send notification: {e}")
+        """Queue notification message for the notification worker"""
+        if self._notify_q is None:
+            logger.error("Failed to send notification: telegram bot not started")
+            return
+        
+        self._notify_q.put_nowait(message)
+    
+    async def _notify_worker(self):
+        """
+        Send queued notifications, coalescing messages that are already waiting
+        
+        A None in the queue stops the worker once everything before it is sent.
+        """
+        pending = None
+        stopping = False
+        
+        while not stopping:
+            message = pending if pending is not None else await self._notify_q.get()
+            pending = None
+            if message is None:
+                break
+            
+            parts = [message]
+            size = len(message)
+            while len(parts) < _NOTIFY_BATCH_SIZE:
+                try:
+                    message = self._notify_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                
+                if message is None:
+                    stopping = True
+                    break
+                
+                size += len(_NOTIFY_SEPARATOR) + len(message)
+                if size > _MAX_MESSAGE_LENGTH:
+                    pending = message
+                    break
+                parts.append(message)
+            
+            await self._deliver(_NOTIFY_SEPARATOR.join(parts))
+    
+    async def _deliver(self, text: str):
+        """Send one message to every configured chat concurrently"""
+        chat_ids = list(self.chat_ids)
+        results = await asyncio.gather(
+            *(self.app.bot.send_message(chat_id=chat_id, text=text) for chat_id in chat_ids),
+            return_exceptions=True
+        )
+        
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to send notification to %s: %s", chat_id, result)
     
     async def send_session_complete(self, stats: Dict[str, Any]):
         """Send session complete notification"""
         message = (
-            "✅ *Backtest Session Complete*\n\n"
-            f"Symbol: `{stats['symbol']}`\n"
-            f"Strategy: `{stats['strategy']}`\n"
-            f"Period: `{stats['start_date']} to {stats['end_date']}`\n"
-            f"Trades: `{stats['trades']}`\n"
+            "✅ <b>Backtest Session Complete</b>\n\n"
+            f"Symbol: <code>{_escape(stats['symbol'])}</code>\n"
+            f"Strategy: <code>{_escape(stats['strategy'])}</code>\n"
+            f"Period: <code>{_escape(stats['start_date'])} to {_escape(stats['end_date'])}</code>\n"
+            f"Trades: <code>{_escape(stats['trades'])}</code>\n"
             f"PnL: {format_pnl(stats['pnl'])}"
         )
         
         await self.send_notification(message)
     
     def start(self):
-        """Start the telegram bot (deprecated - use start_async)"""
-        import asyncio
-        asyncio.run(self.start_async())
+        """
+        Start the telegram bot (deprecated - use start_async)
+        
+        Runs the bot on a new (uvloop when available) event loop that is
+        closed when the bot stops. Inside a running loop the bot is scheduled
+        on it as a task instead.
+        """
+        warnings.warn("start() is deprecated, use start_async()", DeprecationWarning, stacklevel=2)
+        
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            return running.create_task(self.start_async())
+        
+        run_in_new_loop(self.start_async())
     
     async def start_async(self):
         """Start the telegram bot asynchronously"""
-        from telegram.ext import ApplicationBuilder
-        from telegram.request import HTTPXRequest
-        
-        # Create custom request with longer timeout
-        request = HTTPXRequest(
-            connection_pool_size=8,
-            connect_timeout=30.0,
-            read_timeout=30.0,
-            write_timeout=30.0,
-            pool_timeout=30.0
+        from telegram.ext import ApplicationBuilder, Defaults
+        
+        # Outgoing API calls share one pooled HTTP/2 client
+        request = OrjsonRequest(
+            connection_pool_size=32,
+            connect_timeout=10.0,
+            read_timeout=35.0,
+            write_timeout=15.0,
+            pool_timeout=5.0,
+            http_version="2"
         )
         
-        self.app = ApplicationBuilder().token(self.token).request(request).build()
+        # getUpdates long-polls, so its read timeout must outlast the poll timeout
+        poll_request = OrjsonRequest(
+            connection_pool_size=1,
+            connect_timeout=10.0,
+            read_timeout=60.0,
+            write_timeout=15.0,
+            pool_timeout=5.0,
+            http_version="2"
+        )
+        
+        # Non-blocking handlers so a slow callback does not stall other chats,
+        # and HTML parse mode for every message sent through the bot
+        self.app = (
+            ApplicationBuilder()
+            .token(self.token)
+            .request(request)
+            .get_updates_request(poll_request)
+            .concurrent_updates(256)
+            .defaults(Defaults(block=False, parse_mode=ParseMode.HTML))
+            .build()
+        )
         
         # Add error handler
         self.app.add_error_handler(self.error_handler)
         
-        # Add handlers
-        self.app.add_handler(CommandHandler("start", self.start_command))
-        self.app.add_handler(CallbackQueryHandler(self.button_handler))
-        
-        # Add command handlers for settings
-        self.app.add_handler(CommandHandler("addsymbol", self.add_symbol_command))
-        self.app.add_handler(CommandHandler("removesymbol", self.remove_symbol_command))
-        self.app.add_handler(CommandHandler("listsymbols", self.list_symbols_command))
-        self.app.add_handler(CommandHandler("setcapital", self.set_capital_command))
+        # Add handlers in one group (non-blocking via the application defaults)
+        self.app.add_handlers({0: [
+            CommandHandler("start", self.start_command),
+            CallbackQueryHandler(self.button_handler),
+            CommandHandler("addsymbol", self.add_symbol_command),
+            CommandHandler("removesymbol", self.remove_symbol_command),
+            CommandHandler("listsymbols", self.list_symbols_command),
+            CommandHandler("setcapital", self.set_capital_command)
+        ]})
         
         # Start bot
         logger.info("Starting Backtest Telegram Bot")
         await self.app.initialize()
         await self.app.start()
-        await self.app.updater.start_polling(drop_pending_updates=True)
+        await self.app.updater.start_polling(
+            drop_pending_updates=True,
+            timeout=30,
+            poll_interval=0.0,
+            bootstrap_retries=-1,
+            allowed_updates=Update.ALL_TYPES
+        )
+        
+        self._stop_event = asyncio.Event()
+        self._settings_lock = asyncio.Lock()
+        self._notify_q = asyncio.Queue()
+        self._notify_task = asyncio.create_task(self._notify_worker())
+        
+        # Stop promptly on SIGTERM (only possible from the main thread)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._stop_event.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
         
-        # Keep running
+        # Keep running until stopped or cancelled
         try:
-            while True:
-                await asyncio.sleep(1)
+            await self._stop_event.wait()
         except asyncio.CancelledError:
             logger.info("Telegram bot stopping...")
         finally:
+            # Flush queued notifications before the bot goes away
+            self._notify_q.put_nowait(None)
+            await self._notify_task
+            self._notify_q = None
+            
             await self.app.updater.stop()
             await self.app.stop()
             await self.app.shutdown()
     
+    async def stop(self):
+        """Stop the telegram bot started by start_async"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+    
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors"""
-        logger.error(f"Telegram error: {context.error}", exc_info=context.error)
+        logger.error("Telegram error: %s", context.error, exc_info=context.error)
+        
+        if not isinstance(update, Update) or not update.effective_chat:
+            return
+        
+        # Rate-limit replies so error cascades (e.g. flood waits) are not amplified
+        chat_id = update.effective_chat.id
+        now = time.monotonic()
+        if now < self._err_bucket.get(chat_id, 0.0):
+            return
+        self._err_bucket[chat_id] = now + _ERROR_REPLY_INTERVAL
+        
+        if len(self._err_bucket) > _ERROR_BUCKET_PRUNE_SIZE:
+            self._err_bucket = {
+                cid: until for cid, until in self._err_bucket.items() if until > now
+            }
         
         # Try to notify user
         try:
-            if update and update.effective_message:
+            if update.effective_message:
                 await update.effective_message.reply_text(
                     "⚠️ An error occurred. Please try again."
                 )
         except Exception as e:
-            logger.error(f"Could not send error message: {e}")
+            logger.error("Could not send error message: %s", e)
+    
+    async def _reply(self, update: Update, template: str, **fields):
+        """Reply with a message template, HTML-escaping string fields"""
+        escaped = {
+            key: html.escape(value) if isinstance(value, str) else value
+            for key, value in fields.items()
+        }
+        await update.message.reply_text(template.format(**escaped))
+    
+    def _change_symbols(self, method: str, *args):
+        """
+        Apply a symbol manager change and persist the new active symbols
+        
+        Runs in a worker thread so the whole change costs one thread hop;
+        callers hold _settings_lock.
+        
+        Returns:
+            (success, active_symbols) - active_symbols is None on failure
+        """
+        symbol_manager = self.bot_controller.symbol_manager
+        if not getattr(symbol_manager, method)(*args):
+            return False, None
+        
+        active_symbols = symbol_manager.get_active_symbols()
+        self.bot_controller.update_settings('active_symbols', active_symbols)
+        return True, active_symbols
     
     async def add_symbol_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /addsymbol command"""
-        if not context.args or len(context.args) < 2:
-            await update.message.reply_text(
-                "Usage: `/addsymbol SEGMENT SYMBOL`\n"
-                "Example: `/addsymbol NSE_FO NIFTY24JANFUT`",
-                parse_mode='Markdown'
-            )
-            return
+        args = context.args
+        if not args or len(args) < 2:
+            return await update.message.reply_text(_ADD_SYMBOL_USAGE)
         
-        segment = context.args[0]
-        symbol = context.args[1]
+        segment, symbol = args[0], args[1]
         
         # Add symbol via bot controller
-        success = self.bot_controller.symbol_manager.add_active_symbol(segment, symbol)
+        async with self._settings_lock:
+            success, active_symbols = await asyncio.to_thread(
+                self._change_symbols, 'add_active_symbol', segment, symbol
+            )
         
         if success:
-            # Update settings
-            active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
-            self.bot_controller.update_settings('active_symbols', active_symbols)
-            
-            await update.message.reply_text(
-                f"✅ Added symbol: `{symbol}` from `{segment}`\n"
-                f"Total active symbols: {len(active_symbols)}",
-                parse_mode='Markdown'
-            )
+            await self._reply(update, _SYM_ADDED, symbol=symbol, segment=segment,
+                              count=len(active_symbols))
         else:
-            await update.message.reply_text(
-                f"❌ Failed to add symbol: `{symbol}`\n"
-                "Make sure the segment and symbol are correct.",
-                parse_mode='Markdown'
-            )
+            await self._reply(update, _SYM_ADD_FAIL, symbol=symbol)
     
     async def remove_symbol_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /removesymbol command"""
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: `/removesymbol SYMBOL`\n"
-                "Example: `/removesymbol NIFTY24JANFUT`",
-                parse_mode='Markdown'
-            )
-            return
+        args = context.args
+        if not args:
+            return await update.message.reply_text(_REMOVE_SYMBOL_USAGE)
         
-        symbol = context.args[0]
+        symbol = args[0]
         
         # Remove symbol
-        success = self.bot_controller.symbol_manager.remove_active_symbol(symbol)
+        async with self._settings_lock:
+            success, active_symbols = await asyncio.to_thread(
+                self._change_symbols, 'remove_active_symbol', symbol
+            )
         
         if success:
-            # Update settings
-            active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
-            self.bot_controller.update_settings('active_symbols', active_symbols)
-            
-            await update.message.reply_text(
-                f"✅ Removed symbol: `{symbol}`\n"
-                f"Total active symbols: {len(active_symbols)}",
-                parse_mode='Markdown'
-            )
+            await self._reply(update, _SYM_REMOVED, symbol=symbol, count=len(active_symbols))
         else:
-            await update.message.reply_text(
-                f"❌ Symbol not found: `{symbol}`",
-                parse_mode='Markdown'
-            )
+            await self._reply(update, _SYM_REMOVE_FAIL, symbol=symbol)
     
     async def list_symbols_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /listsymbols command - FIXED"""
-        active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
+        active_symbols = await asyncio.to_thread(self.bot_controller.symbol_manager.get_active_symbols)
         
         if not active_symbols:
             await update.message.reply_text(
-                "📝 *Active Symbols*\n\n"
+                "📝 <b>Active Symbols</b>\n\n"
                 "No symbols configured yet.\n\n"
                 "Add symbols using:\n"
-                "`/addsymbol SEGMENT SYMBOL`",
-                parse_mode='Markdown'
+                "<code>/addsymbol SEGMENT SYMBOL</code>"
             )
             return
         
-        message = "📝 *Active Symbols*\n\n"
+        # Build entries once, then pack them into messages under Telegram's limit
+        chunks = []
+        lines = ["📝 <b>Active Symbols</b>\n"]
+        size = len(lines[0])
         for sym in active_symbols:
             # Handle both old and new symbol structure
-            lot_size = sym.get('lot_size') or sym.get('details', {}).get('lotsize', 'N/A')
-            token = sym.get('token') or sym.get('details', {}).get('token', 'N/A')
+            details = sym.get('details') or {}
+            lot_size = sym.get('lot_size') or details.get('lotsize', 'N/A')
+            token = sym.get('token') or details.get('token', 'N/A')
             
-            message += (
-                f"• `{sym['symbol']}` ({sym['segment']})\n"
-                f"  Lot Size: {lot_size}, Token: {token}\n"
+            line = (
+                f"• <code>{_escape(sym['symbol'])}</code> ({_escape(sym['segment'])})\n"
+                f"  Lot Size: {_escape(lot_size)}, Token: {_escape(token)}"
             )
-        
-        await update.message.reply_text(message, parse_mode='Markdown')
+            if size + len(line) + 1 > _LIST_CHUNK_LENGTH:
+                chunks.append("\n".join(lines))
+                lines = []
+                size = 0
+            lines.append(line)
+            size += len(line) + 1
+        chunks.append("\n".join(lines))
+        
+        # Sent one after another so the list arrives in order
+        for chunk in chunks:
+            await update.message.reply_text(chunk)
     
     async def set_capital_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setcapital command"""
-        if not context.args or len(context.args) < 1:
-            await update.message.reply_text(
-                "Usage: `/setcapital AMOUNT`\n"
-                "Example: `/setcapital 100000`",
-                parse_mode='Markdown'
+        args = context.args
+        if not args:
+            return await update.message.reply_text(_SET_CAPITAL_USAGE)
+        
+        # Amounts may use , or _ as thousands separators
+        raw = args[0].replace(',', '').replace('_', '')
+        if not _looks_like_number(raw):
+            return await update.message.reply_text(
+                "❌ Invalid amount. Please provide a number."
             )
-            return
         
-        try:
-            capital = float(context.args[0])
-            self.bot_controller.update_settings('capital', capital)
-            
-            await update.message.reply_text(
-                f"✅ Capital set to: {format_number(capital)}",
-                parse_mode='Markdown'
-            )
-        except ValueError:
-            await update.message.reply_text(
-                "❌ Invalid amount. Please provide a number.",
-                parse_mode='Markdown'
-            )
\ No newline at end of file
+        capital = float(raw)
+        await self._update('capital', capital)
+        
+        await update.message.reply_text(
+            f"✅ Capital set to: {format_number(capital)}"
+        )
\ No newline at end of file
@@ -3,16 +3,47 @@
 Helper functions for telegram bots with multi-chat support
 """
 
-import yaml
-from typing import List, Union
-from pathlib import Path
+import asyncio
+from typing import List
+
+# Secrets loading and the authorized chat ID cache live in utils.helpers
+from utils.helpers import load_secrets, get_authorized_id_set, is_authorized_user
+
+# uvloop cuts per-callback overhead on the HTTP polling/edit paths
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop, using uvloop when it is installed"""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+def run_in_new_loop(main):
+    """
+    Run a coroutine on a new event loop from new_event_loop
+    
+    Like asyncio.run: the loop is set as this thread's loop while running,
+    then async generators and the default executor are shut down and the
+    loop is closed.
+    """
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
 
 def load_telegram_config(bot_type: str = "realtime") -> dict:
     """Load telegram configuration with multi-chat support"""
-    secrets_path = Path("config/secrets.yaml")
-    
-    with open(secrets_path, 'r') as f:
-        secrets = yaml.safe_load(f)
+    secrets = load_secrets()
     
     tg_config = secrets['telegram'][bot_type]
     
@@ -31,12 +62,6 @@ def load_telegram_config(bot_type: str = "realtime") -> dict:
         'chat_ids': chat_ids
     }
 
-def is_authorized_user(chat_id: Union[str, int], bot_type: str = "realtime") -> bool:
-    """Check if chat_id is authorized to use the bot"""
-    config = load_telegram_config(bot_type)
-    chat_id_str = str(chat_id)
-    return chat_id_str in [str(cid) for cid in config['chat_ids']]
-
 def get_authorized_chat_ids(bot_type: str = "realtime") -> List[str]:
     """Get all authorized chat IDs"""
     config = load_telegram_config(bot_type)
@@ -3,15 +3,151 @@
 Realtime Bot Telegram Interface - FIXED VERSION
 """
 
+import html
 import asyncio
+import signal
+import warnings
+import weakref
+from functools import lru_cache
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 from typing import Dict, Any
+from tg.helpers import run_in_new_loop
 from utils.helpers import load_secrets, format_pnl, format_number
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__, "realtime")
 
+def _escape(value: Any) -> str:
+    """HTML-escape a value for interpolation into an HTML message"""
+    return html.escape(str(value))
+
+@lru_cache(maxsize=1)
+def _cached_secrets() -> Dict[str, Any]:
+    """Load secrets once per process"""
+    return load_secrets()
+
+# Trade alerts queued close together are coalesced into one message
+_NOTIFY_SEPARATOR = "\n\n---\n\n"
+_NOTIFY_BATCH_SIZE = 20
+_MAX_MESSAGE_LENGTH = 4096
+
+# Static message texts
+_MAIN_MENU_TEXT = (
+    "🤖 <b>ALGO BY GUGAN - Realtime Bot</b>\n\n"
+    "Select an option below:"
+)
+
+_CLOSE_ALL_CONFIRM_TEXT = (
+    "⚠️ <b>Close All Positions</b>\n\n"
+    "Are you sure you want to close ALL open positions at current market price?\n\n"
+    "This action cannot be undone!"
+)
+
+_CONFIRM_LIVE_TEXT = (
+    "⚠️ <b>CONFIRM LIVE TRADING</b>\n\n"
+    "You are about to switch to LIVE trading mode.\n"
+    "Real money will be at risk!\n\n"
+    "Are you sure you want to continue?"
+)
+
+# Static keyboards, built once and shared by every callback
+_MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
+    [InlineKeyboardButton("📊 Stats", callback_data="stats")],
+    [InlineKeyboardButton("📈 Positions", callback_data="positions")],
+    [InlineKeyboardButton("🛑 Close All", callback_data="close_all")],
+    [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
+])
+
+_SETTINGS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Segment/Symbols", callback_data="set_symbols")],
+    [InlineKeyboardButton("🏦 Broker", callback_data="set_broker")],
+    [InlineKeyboardButton("💰 Capital", callback_data="set_capital")],
+    [InlineKeyboardButton("⚠️ Risk", callback_data="set_risk")],
+    [InlineKeyboardButton("🔢 Max Trades", callback_data="set_max_trades")],
+    [InlineKeyboardButton("📊 Strategies", callback_data="set_strategies")],
+    [InlineKeyboardButton("🔄 Paper/Live", callback_data="toggle_mode")],
+    [InlineKeyboardButton("« Back", callback_data="main_menu")]
+])
+
+_BACK_TO_MAIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="main_menu")]])
+
+_BACK_TO_SETTINGS_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="settings")]])
+
+_CLOSE_ALL_CONFIRM_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, Close All", callback_data="close_all_confirmed")],
+    [InlineKeyboardButton("❌ Cancel", callback_data="main_menu")]
+])
+
+_CONFIRM_LIVE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, Go Live", callback_data="confirm_live")],
+    [InlineKeyboardButton("❌ Cancel", callback_data="toggle_mode")]
+])
+
+_BROKER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("AngelOne", callback_data="broker_angelone")],
+    [InlineKeyboardButton("Zerodha", callback_data="broker_zerodha")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+_RISK_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("1%", callback_data="risk_1")],
+    [InlineKeyboardButton("2%", callback_data="risk_2")],
+    [InlineKeyboardButton("3%", callback_data="risk_3")],
+    [InlineKeyboardButton("5%", callback_data="risk_5")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+_MAXTRADES_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("3", callback_data="maxtrades_3")],
+    [InlineKeyboardButton("5", callback_data="maxtrades_5")],
+    [InlineKeyboardButton("8", callback_data="maxtrades_8")],
+    [InlineKeyboardButton("10", callback_data="maxtrades_10")],
+    [InlineKeyboardButton("« Back", callback_data="settings")]
+])
+
+# Strategy toggle keyboards for every (5EMA enabled, SMA enabled) combination
+_STRATEGIES_MARKUPS: Dict[tuple, InlineKeyboardMarkup] = {
+    (ema_on, sma_on): InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            f"{'✅' if ema_on else '☐'} 5 EMA Power of Stocks",
+            callback_data="strategy_5ema"
+        )],
+        [InlineKeyboardButton(
+            f"{'✅' if sma_on else '☐'} SMA Crossover",
+            callback_data="strategy_sma"
+        )],
+        [InlineKeyboardButton("« Back", callback_data="settings")]
+    ])
+    for ema_on in (False, True)
+    for sma_on in (False, True)
+}
+
+def _strategies_markup(active_strategies) -> InlineKeyboardMarkup:
+    """Get the strategy toggle keyboard for the given active strategies"""
+    return _STRATEGIES_MARKUPS[(
+        '5EMA_PowerOfStocks' in active_strategies,
+        'SMA_Crossover' in active_strategies
+    )]
+
+# Paper/live keyboards, keyed by the current mode
+_MODE_MARKUPS = {
+    mode: InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            f"{'🟢' if mode == 'paper' else '⚪'} Paper Trading",
+            callback_data="mode_paper"
+        )],
+        [InlineKeyboardButton(
+            f"{'🔴' if mode == 'live' else '⚪'} Live Trading",
+            callback_data="mode_live"
+        )],
+        [InlineKeyboardButton("« Back", callback_data="settings")]
+    ])
+    for mode in ("paper", "live")
+}
+
 class RealtimeTelegramBot:
     """Telegram interface for Realtime Bot"""
     
@@ -23,504 +159,600 @@ class RealtimeTelegramBot:
             bot_controller: Reference to main bot controller
         """
         self.bot_controller = bot_controller
-        secrets = load_secrets()
-        self.token = secrets['telegram']['realtime']['bot_token']
-        self.chat_ids = secrets['telegram']['realtime']['chat_ids']
+        telegram_config = _cached_secrets()['telegram']['realtime']
+        self.token = telegram_config['bot_token']
+        self.chat_ids = telegram_config['chat_ids']
         self.app = None
+        
+        # Settings snapshot, refreshed when the controller's version changes
+        self._settings_cache = None
+        self._settings_ver = -1
+        
+        # Set to stop start_async; created per run on the running loop
+        self._stop_event = None
+        
+        # Notification queue, its worker and the loop they run on, set in start_async
+        self._notify_q = None
+        self._notify_task = None
+        self._loop = None
+        
+        # callback_data -> handler, and <prefix>_<arg> -> handler(arg, ...)
+        self._exact = {
+            "settings": self.settings_menu,
+            "stats": self.stats_menu,
+            "positions": self.positions_menu,
+            "close_all": self.close_all_confirm,
+            "close_all_confirmed": self.close_all_execute,
+            "main_menu": self.show_main_menu,
+            "refresh": self.show_main_menu,
+            "set_symbols": self.set_symbols_menu,
+            "set_broker": self.set_broker_menu,
+            "set_capital": self.set_capital_menu,
+            "set_risk": self.set_risk_menu,
+            "set_max_trades": self.set_max_trades_menu,
+            "set_strategies": self.set_strategies_menu,
+            "toggle_mode": self.toggle_mode_menu,
+            "confirm_live": self.confirm_live
+        }
+        self._prefix = {
+            "risk": self._apply_risk,
+            "maxtrades": self._apply_maxtrades,
+            "broker": self._apply_broker,
+            "strategy": self._toggle_strategy,
+            "mode": self._apply_mode
+        }
+        
+        # Per-chat locks keep callbacks ordered within a chat only
+        self._chat_locks = weakref.WeakValueDictionary()
+        
+        # Serializes settings changes across all chats; created in start_async
+        self._settings_lock = None
+    
+    def _get_settings(self) -> Dict[str, Any]:
+        """Get controller settings, refetching only after they were updated"""
+        version = self.bot_controller.settings_version
+        if version != self._settings_ver:
+            self._settings_cache = self.bot_controller.get_settings()
+            self._settings_ver = version
+        return self._settings_cache
+    
+    async def _update(self, key: str, value: Any):
+        """Update a controller setting without blocking the event loop on disk I/O"""
+        async with self._settings_lock:
+            await asyncio.to_thread(self.bot_controller.update_settings, key, value)
+    
+    async def _render(self, query, text: str, reply_markup: InlineKeyboardMarkup,
+                      answered: bool = False):
+        """
+        Answer the callback and edit its message concurrently
+        
+        Pass answered=True when the caller already answered the callback.
+        """
+        calls = [] if answered else [query.answer()]
+        calls.append(query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML'))
+        
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BadRequest):
+                # Not modified means the message already shows this content
+                if "not modified" not in str(result).lower():
+                    logger.warning("Telegram rejected menu update: %s", result)
+            elif isinstance(result, Exception):
+                raise result
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
-        keyboard = [
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-            [InlineKeyboardButton("📊 Stats", callback_data="stats")],
-            [InlineKeyboardButton("📈 Positions", callback_data="positions")],
-            [InlineKeyboardButton("🛑 Close All", callback_data="close_all")],
-            [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        message = (
-            "🤖 *ALGO BY GUGAN - Realtime Bot*\n\n"
-            "Select an option below:"
-        )
-        
-        await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await update.message.reply_text(_MAIN_MENU_TEXT, reply_markup=_MAIN_MENU_MARKUP, parse_mode='HTML')
     
-    async def settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            answered: bool = False):
         """Display settings menu"""
         query = update.callback_query
-        await query.answer()
-        
-        keyboard = [
-            [InlineKeyboardButton("📝 Segment/Symbols", callback_data="set_symbols")],
-            [InlineKeyboardButton("🏦 Broker", callback_data="set_broker")],
-            [InlineKeyboardButton("💰 Capital", callback_data="set_capital")],
-            [InlineKeyboardButton("⚠️ Risk", callback_data="set_risk")],
-            [InlineKeyboardButton("🔢 Max Trades", callback_data="set_max_trades")],
-            [InlineKeyboardButton("📊 Strategies", callback_data="set_strategies")],
-            [InlineKeyboardButton("🔄 Paper/Live", callback_data="toggle_mode")],
-            [InlineKeyboardButton("« Back", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        settings = self.bot_controller.get_settings()
+        
+        reply_markup = _SETTINGS_MARKUP
+        
+        settings = self._get_settings()
         
         message = (
-            "⚙️ *Current Settings*\n\n"
-            f"🏦 Broker: `{settings['broker']}`\n"
-            f"📝 Segment: `{settings['segment']}`\n"
-            f"💰 Capital: `{format_number(settings['capital'])}`\n"
-            f"⚠️ Risk: `{settings['risk_per_trade']}%`\n"
-            f"🔢 Max Trades: `{settings['max_trades']}`\n"
-            f"🔄 Mode: `{settings['mode'].upper()}`\n"
-            f"📊 Active Strategies: `{len(settings['active_strategies'])}`\n"
-            f"📈 Active Symbols: `{len(settings['active_symbols'])}`\n"
+            "⚙️ <b>Current Settings</b>\n\n"
+            f"🏦 Broker: <code>{_escape(settings['broker'])}</code>\n"
+            f"📝 Segment: <code>{_escape(settings['segment'])}</code>\n"
+            f"💰 Capital: <code>{format_number(settings['capital'])}</code>\n"
+            f"⚠️ Risk: <code>{settings['risk_per_trade']}%</code>\n"
+            f"🔢 Max Trades: <code>{settings['max_trades']}</code>\n"
+            f"🔄 Mode: <code>{_escape(settings['mode'].upper())}</code>\n"
+            f"📊 Active Strategies: <code>{len(settings['active_strategies'])}</code>\n"
+            f"📈 Active Symbols: <code>{len(settings['active_symbols'])}</code>\n"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup, answered)
     
     async def stats_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Display statistics"""
         query = update.callback_query
-        await query.answer()
         
         stats = self.bot_controller.get_stats()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_MAIN_MARKUP
         
         message = (
-            "📊 *Statistics & Performance*\n\n"
-            f"*Open Positions:* `{stats['open_positions']}`\n"
-            f"*Closed Positions:* `{stats['closed_positions']}`\n\n"
-            f"*Realized PnL:* {format_pnl(stats['realized_pnl'])}\n"
-            f"*Unrealized PnL:* {format_pnl(stats['unrealized_pnl'])}\n"
-            f"*Total PnL:* {format_pnl(stats['total_pnl'])}\n\n"
-            f"*Win Rate:* `{stats['win_rate']:.2f}%`\n"
-            f"*Winning Trades:* `{stats['winning_trades']}`\n"
-            f"*Losing Trades:* `{stats['losing_trades']}`\n"
+            "📊 <b>Statistics &amp; Performance</b>\n\n"
+            f"<b>Open Positions:</b> <code>{stats['open_positions']}</code>\n"
+            f"<b>Closed Positions:</b> <code>{stats['closed_positions']}</code>\n\n"
+            f"<b>Realized PnL:</b> {format_pnl(stats['realized_pnl'])}\n"
+            f"<b>Unrealized PnL:</b> {format_pnl(stats['unrealized_pnl'])}\n"
+            f"<b>Total PnL:</b> {format_pnl(stats['total_pnl'])}\n\n"
+            f"<b>Win Rate:</b> <code>{stats['win_rate']:.2f}%</code>\n"
+            f"<b>Winning Trades:</b> <code>{stats['winning_trades']}</code>\n"
+            f"<b>Losing Trades:</b> <code>{stats['losing_trades']}</code>\n"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def positions_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Display open positions"""
         query = update.callback_query
-        await query.answer()
         
         positions = self.bot_controller.get_open_positions()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_MAIN_MARKUP
         
         if not positions:
-            message = "📈 *Open Positions*\n\nNo open positions"
+            message = "📈 <b>Open Positions</b>\n\nNo open positions"
         else:
-            message = "📈 *Open Positions*\n\n"
+            message = "📈 <b>Open Positions</b>\n\n"
             for pos in positions:
                 ltp = self.bot_controller.get_ltp(pos['symbol'])
                 current_pnl = self.bot_controller.calculate_position_pnl(pos, ltp)
                 
                 message += (
-                    f"*{pos['symbol']}* ({pos['strategy']})\n"
-                    f"Action: `{pos['action']}`\n"
-                    f"Qty: `{pos['quantity']}`\n"
-                    f"Entry: `₹{pos['entry_price']:.2f}`\n"
-                    f"LTP: `₹{ltp:.2f}`\n"
+                    f"<b>{_escape(pos['symbol'])}</b> ({_escape(pos['strategy'])})\n"
+                    f"Action: <code>{_escape(pos['action'])}</code>\n"
+                    f"Qty: <code>{pos['quantity']}</code>\n"
+                    f"Entry: <code>₹{pos['entry_price']:.2f}</code>\n"
+                    f"LTP: <code>₹{ltp:.2f}</code>\n"
                     f"PnL: {format_pnl(current_pnl)}\n"
-                    f"SL: `₹{pos['stop_loss']:.2f}` | Target: `₹{pos['target']:.2f}`\n\n"
+                    f"SL: <code>₹{pos['stop_loss']:.2f}</code> | Target: <code>₹{pos['target']:.2f}</code>\n\n"
                 )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def close_all_confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Confirm close all positions"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [
-            [InlineKeyboardButton("✅ Yes, Close All", callback_data="close_all_confirmed")],
-            [InlineKeyboardButton("❌ Cancel", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        message = (
-            "⚠️ *Close All Positions*\n\n"
-            "Are you sure you want to close ALL open positions at current market price?\n\n"
-            "This action cannot be undone!"
-        )
-        
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, _CLOSE_ALL_CONFIRM_TEXT, _CLOSE_ALL_CONFIRM_MARKUP)
     
     async def close_all_execute(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Execute close all positions"""
         query = update.callback_query
-        await query.answer()
         
         result = self.bot_controller.close_all_positions()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_MAIN_MARKUP
         
         message = (
-            f"✅ *Positions Closed*\n\n"
+            f"✅ <b>Positions Closed</b>\n\n"
             f"Closed {result['count']} positions\n"
             f"Total PnL: {format_pnl(result['total_pnl'])}"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle button callbacks"""
+        """Handle button callbacks, serialized per chat"""
+        chat_id = update.effective_chat.id
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_id] = lock
+        
+        async with lock:
+            await self._dispatch(update, context)
+    
+    async def _dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Route a button callback to its handler"""
         query = update.callback_query
         data = query.data
         
-        if data == "settings":
-            await self.settings_menu(update, context)
-        elif data == "stats":
-            await self.stats_menu(update, context)
-        elif data == "positions":
-            await self.positions_menu(update, context)
-        elif data == "close_all":
-            await self.close_all_confirm(update, context)
-        elif data == "close_all_confirmed":
-            await self.close_all_execute(update, context)
-        elif data == "main_menu" or data == "refresh":
-            await self.show_main_menu(update, context)
-        elif data == "set_symbols":
-            await self.set_symbols_menu(update, context)
-        elif data == "set_broker":
-            await self.set_broker_menu(update, context)
-        elif data == "set_capital":
-            await self.set_capital_menu(update, context)
-        elif data == "set_risk":
-            await self.set_risk_menu(update, context)
-        elif data == "set_max_trades":
-            await self.set_max_trades_menu(update, context)
-        elif data == "set_strategies":
-            await self.set_strategies_menu(update, context)
-        elif data == "toggle_mode":
-            await self.toggle_mode_menu(update, context)
-        elif data.startswith("risk_"):
-            risk_value = data.split("_")[1]
-            self.bot_controller.update_settings('risk_per_trade', float(risk_value))
-            await query.answer(f"Risk set to {risk_value}%", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("maxtrades_"):
-            max_trades = int(data.split("_")[1])
-            self.bot_controller.update_settings('max_trades', max_trades)
-            await query.answer(f"Max trades set to {max_trades}", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("broker_"):
-            broker = data.split("_")[1]
-            self.bot_controller.update_settings('broker', broker)
-            await query.answer(f"Broker set to {broker}", show_alert=True)
-            await self.settings_menu(update, context)
-        elif data.startswith("strategy_"):
-            strategy_name = "5EMA_PowerOfStocks" if data == "strategy_5ema" else "SMA_Crossover"
-            current_strategies = self.bot_controller.get_settings()['active_strategies']
+        handler = self._exact.get(data)
+        if handler:
+            return await handler(update, context)
+        
+        prefix, _, arg = data.partition("_")
+        handler = self._prefix.get(prefix)
+        if handler:
+            return await handler(arg, update, context)
+        
+        await query.answer("Feature coming soon!", show_alert=True)
+    
+    async def _apply_risk(self, risk_value: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle risk_<percent> callbacks"""
+        await self._update('risk_per_trade', float(risk_value))
+        await asyncio.gather(
+            update.callback_query.answer(f"Risk set to {risk_value}%", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _apply_maxtrades(self, value: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle maxtrades_<count> callbacks"""
+        max_trades = int(value)
+        await self._update('max_trades', max_trades)
+        await asyncio.gather(
+            update.callback_query.answer(f"Max trades set to {max_trades}", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _apply_broker(self, broker: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle broker_<name> callbacks"""
+        await self._update('broker', broker)
+        await asyncio.gather(
+            update.callback_query.answer(f"Broker set to {broker}", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
+    
+    async def _toggle_strategy(self, key: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle strategy_<key> callbacks"""
+        query = update.callback_query
+        strategy_name = "5EMA_PowerOfStocks" if key == "5ema" else "SMA_Crossover"
+        # Read and write under the lock so concurrent toggles are not lost
+        async with self._settings_lock:
+            # Build a new list; the cached settings snapshot must not be mutated
+            current_strategies = list(self._get_settings()['active_strategies'])
             if strategy_name in current_strategies:
                 current_strategies.remove(strategy_name)
-                await query.answer(f"Disabled {strategy_name}", show_alert=False)
+                state = "Disabled"
             else:
                 current_strategies.append(strategy_name)
-                await query.answer(f"Enabled {strategy_name}", show_alert=False)
-            self.bot_controller.update_settings('active_strategies', current_strategies)
-            await self.set_strategies_menu(update, context)
-        elif data.startswith("mode_"):
-            mode = data.split("_")[1]
-            if mode == "live":
-                # Show warning before switching to live
-                keyboard = [
-                    [InlineKeyboardButton("✅ Yes, Go Live", callback_data="confirm_live")],
-                    [InlineKeyboardButton("❌ Cancel", callback_data="toggle_mode")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                message = (
-                    "⚠️ *CONFIRM LIVE TRADING*\n\n"
-                    "You are about to switch to LIVE trading mode.\n"
-                    "Real money will be at risk!\n\n"
-                    "Are you sure you want to continue?"
-                )
-                await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
-            else:
-                self.bot_controller.update_settings('mode', mode)
-                await query.answer("Switched to Paper mode", show_alert=True)
-                await self.settings_menu(update, context)
-        elif data == "confirm_live":
-            self.bot_controller.update_settings('mode', 'live')
-            await query.answer("⚠️ LIVE MODE ACTIVATED", show_alert=True)
-            await self.settings_menu(update, context)
+                state = "Enabled"
+            await asyncio.to_thread(
+                self.bot_controller.update_settings, 'active_strategies', current_strategies
+            )
+        await asyncio.gather(
+            query.answer(f"{state} {strategy_name}", show_alert=False),
+            self.set_strategies_menu(update, context, answered=True)
+        )
+    
+    async def _apply_mode(self, mode: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle mode_<paper|live> callbacks; live asks for confirmation first"""
+        query = update.callback_query
+        if mode == "live":
+            await self._render(query, _CONFIRM_LIVE_TEXT, _CONFIRM_LIVE_MARKUP)
         else:
-            await query.answer("Feature coming soon!", show_alert=True)
+            await self._update('mode', mode)
+            await asyncio.gather(
+                query.answer("Switched to Paper mode", show_alert=True),
+                self.settings_menu(update, context, answered=True)
+            )
+    
+    async def confirm_live(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Switch to live mode after confirmation"""
+        await self._update('mode', 'live')
+        await asyncio.gather(
+            update.callback_query.answer("⚠️ LIVE MODE ACTIVATED", show_alert=True),
+            self.settings_menu(update, context, answered=True)
+        )
     
     async def set_symbols_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Symbol selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="settings")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_SETTINGS_MARKUP
         
         message = (
-            "📝 *Symbol Selection*\n\n"
+            "📝 <b>Symbol Selection</b>\n\n"
             "To add symbols:\n"
-            "1. Use command: `/addsymbol SEGMENT SYMBOL`\n"
-            "   Example: `/addsymbol NSE_FO NIFTY24JANFUT`\n\n"
-            "2. To remove: `/removesymbol SYMBOL`\n"
-            "   Example: `/removesymbol NIFTY24JANFUT`\n\n"
-            "3. To list active: `/listsymbols`\n\n"
-            f"Currently active symbols: {len(self.bot_controller.get_settings()['active_symbols'])}"
+            "1. Use command: <code>/addsymbol SEGMENT SYMBOL</code>\n"
+            "   Example: <code>/addsymbol NSE_FO NIFTY24JANFUT</code>\n\n"
+            "2. To remove: <code>/removesymbol SYMBOL</code>\n"
+            "   Example: <code>/removesymbol NIFTY24JANFUT</code>\n\n"
+            "3. To list active: <code>/listsymbols</code>\n\n"
+            f"Currently active symbols: {len(self._get_settings()['active_symbols'])}"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_broker_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Broker selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("AngelOne", callback_data="broker_angelone")],
-            [InlineKeyboardButton("Zerodha", callback_data="broker_zerodha")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BROKER_MARKUP
         
         message = (
-            f"🏦 *Broker Selection*\n\n"
-            f"Current broker: `{settings['broker']}`\n\n"
+            f"🏦 <b>Broker Selection</b>\n\n"
+            f"Current broker: <code>{_escape(settings['broker'])}</code>\n\n"
             "Select a broker:"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_capital_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Capital setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [[InlineKeyboardButton("« Back", callback_data="settings")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _BACK_TO_SETTINGS_MARKUP
         
         message = (
-            f"💰 *Capital Setting*\n\n"
+            f"💰 <b>Capital Setting</b>\n\n"
             f"Current capital: {format_number(settings['capital'])}\n\n"
             "To change capital, use command:\n"
-            "`/setcapital AMOUNT`\n\n"
-            "Example: `/setcapital 100000`"
+            "<code>/setcapital AMOUNT</code>\n\n"
+            "Example: <code>/setcapital 100000</code>"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_risk_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Risk setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("1%", callback_data="risk_1")],
-            [InlineKeyboardButton("2%", callback_data="risk_2")],
-            [InlineKeyboardButton("3%", callback_data="risk_3")],
-            [InlineKeyboardButton("5%", callback_data="risk_5")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _RISK_MARKUP
         
         message = (
-            f"⚠️ *Risk per Trade*\n\n"
-            f"Current risk: `{settings['risk_per_trade']}%`\n\n"
+            f"⚠️ <b>Risk per Trade</b>\n\n"
+            f"Current risk: <code>{settings['risk_per_trade']}%</code>\n\n"
             "Select risk percentage:"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def set_max_trades_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Max trades setting menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         
-        keyboard = [
-            [InlineKeyboardButton("3", callback_data="maxtrades_3")],
-            [InlineKeyboardButton("5", callback_data="maxtrades_5")],
-            [InlineKeyboardButton("8", callback_data="maxtrades_8")],
-            [InlineKeyboardButton("10", callback_data="maxtrades_10")],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _MAXTRADES_MARKUP
         
         message = (
-            f"🔢 *Maximum Trades*\n\n"
-            f"Current limit: `{settings['max_trades']}`\n\n"
+            f"🔢 <b>Maximum Trades</b>\n\n"
+            f"Current limit: <code>{settings['max_trades']}</code>\n\n"
             "Select maximum simultaneous trades:"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
-    async def set_strategies_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def set_strategies_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                  answered: bool = False):
         """Strategy selection menu"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         active_strategies = settings['active_strategies']
         
-        keyboard = [
-            [InlineKeyboardButton(
-                f"{'✅' if '5EMA_PowerOfStocks' in active_strategies else '☐'} 5 EMA Power of Stocks",
-                callback_data="strategy_5ema"
-            )],
-            [InlineKeyboardButton(
-                f"{'✅' if 'SMA_Crossover' in active_strategies else '☐'} SMA Crossover",
-                callback_data="strategy_sma"
-            )],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _strategies_markup(active_strategies)
         
         message = (
-            f"📊 *Strategy Selection*\n\n"
+            f"📊 <b>Strategy Selection</b>\n\n"
             f"Active strategies: {len(active_strategies)}\n\n"
             "Click to toggle strategies:"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup, answered)
     
     async def toggle_mode_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Toggle paper/live mode"""
         query = update.callback_query
-        await query.answer()
         
-        settings = self.bot_controller.get_settings()
+        settings = self._get_settings()
         current_mode = settings['mode']
         
-        keyboard = [
-            [InlineKeyboardButton(
-                f"{'🟢' if current_mode == 'paper' else '⚪'} Paper Trading",
-                callback_data="mode_paper"
-            )],
-            [InlineKeyboardButton(
-                f"{'🔴' if current_mode == 'live' else '⚪'} Live Trading",
-                callback_data="mode_live"
-            )],
-            [InlineKeyboardButton("« Back", callback_data="settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _MODE_MARKUPS.get(current_mode) or _MODE_MARKUPS['paper']
         
         message = (
-            f"🔄 *Trading Mode*\n\n"
-            f"Current mode: `{current_mode.upper()}`\n\n"
-            "⚠️ *Warning*: Live mode will execute real trades!\n"
+            f"🔄 <b>Trading Mode</b>\n\n"
+            f"Current mode: <code>{_escape(current_mode.upper())}</code>\n\n"
+            "⚠️ <b>Warning</b>: Live mode will execute real trades!\n"
             "Only switch after thorough testing.\n\n"
             "Select mode:"
         )
         
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._render(query, message, reply_markup)
     
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show main menu (for callback queries)"""
         query = update.callback_query
-        await query.answer()
         
-        keyboard = [
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-            [InlineKeyboardButton("📊 Stats", callback_data="stats")],
-            [InlineKeyboardButton("📈 Positions", callback_data="positions")],
-            [InlineKeyboardButton("🛑 Close All", callback_data="close_all")],
-            [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        message = (
-            "🤖 *ALGO BY GUGAN - Realtime Bot*\n\n"
-            "Select an option below:"
+        await self._render(query, _MAIN_MENU_TEXT, _MAIN_MENU_MARKUP)
+    
+    @staticmethod
+    def _trade_message(trade_data: Dict[str, Any]) -> str:
+        """Format a trade alert"""
+        return (
+            f"{'📈' if trade_data['action'] == 'BUY' else '📉'} <b>Trade Alert</b>\n\n"
+            f"Symbol: <code>{_escape(trade_data['symbol'])}</code>\n"
+            f"Action: <code>{_escape(trade_data['action'])}</code>\n"
+            f"Quantity: <code>{trade_data['quantity']}</code>\n"
+            f"Price: <code>₹{trade_data['price']:.2f}</code>\n"
+            f"Strategy: <code>{_escape(trade_data['strategy'])}</code>\n"
+            f"Mode: <code>{_escape(trade_data['mode'].upper())}</code>\n"
         )
-        
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def send_trade_notification(self, trade_data: Dict[str, Any]):
-        """Send trade notification"""
-        message = (
-            f"{'📈' if trade_data['action'] == 'BUY' else '📉'} *Trade Alert*\n\n"
-            f"Symbol: `{trade_data['symbol']}`\n"
-            f"Action: `{trade_data['action']}`\n"
-            f"Quantity: `{trade_data['quantity']}`\n"
-            f"Price: `₹{trade_data['price']:.2f}`\n"
-            f"Strategy: `{trade_data['strategy']}`\n"
-            f"Mode: `{trade_data['mode'].upper()}`\n"
-        )
+        """Send trade notification (from the bot's event loop)"""
+        if self._notify_q is None:
+            logger.error("Failed to send notification: telegram bot not started")
+            return
+        
+        self._notify_q.put_nowait(self._trade_message(trade_data))
+    
+    def notify_trade(self, trade_data: Dict[str, Any]):
+        """
+        Send trade notification from any thread
+        
+        The queue is not thread-safe, so the message is handed to the bot's
+        event loop, which enqueues it.
+        """
+        loop, queue = self._loop, self._notify_q
+        if loop is None or queue is None:
+            logger.error("Failed to send notification: telegram bot not started")
+            return
         
         try:
-            await self.app.bot.send_message(
-                chat_ids=self.chat_ids,
-                text=message,
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            logger.error(f"Failed to send notification: {e}")
+            loop.call_soon_threadsafe(queue.put_nowait, self._trade_message(trade_data))
+        except RuntimeError as e:
+            # The loop was closed while shutting down
+            logger.error("Failed to send notification: %s", e)
+    
+    async def _notify_worker(self):
+        """
+        Send queued notifications, coalescing messages that are already waiting
+        
+        A None in the queue stops the worker once everything before it is sent.
+        """
+        pending = None
+        stopping = False
+        
+        while not stopping:
+            message = pending if pending is not None else await self._notify_q.get()
+            pending = None
+            if message is None:
+                break
+            
+            parts = [message]
+            size = len(message)
+            while len(parts) < _NOTIFY_BATCH_SIZE:
+                try:
+                    message = self._notify_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                
+                if message is None:
+                    stopping = True
+                    break
+                
+                size += len(_NOTIFY_SEPARATOR) + len(message)
+                if size > _MAX_MESSAGE_LENGTH:
+                    pending = message
+                    break
+                parts.append(message)
+            
+            await self._deliver(_NOTIFY_SEPARATOR.join(parts))
+    
+    async def _deliver(self, text: str):
+        """Send one message to every configured chat concurrently"""
+        chat_ids = list(self.chat_ids)
+        results = await asyncio.gather(
+            *(self.app.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML') for chat_id in chat_ids),
+            return_exceptions=True
+        )
+        
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to send notification to %s: %s", chat_id, result)
     
     def start(self):
         """Start the telegram bot (deprecated - use start_async)"""
-        import asyncio
-        asyncio.run(self.start_async())
+        warnings.warn("start() is deprecated, use start_async()", DeprecationWarning, stacklevel=2)
+        
+        # Inside a running loop, schedule on it instead of starting a new one
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            return running.create_task(self.start_async())
+        
+        # New loop (uvloop when available), cleaned up like asyncio.run
+        run_in_new_loop(self.start_async())
     
     async def start_async(self):
         """Start the telegram bot asynchronously"""
         from telegram.ext import ApplicationBuilder
         from telegram.request import HTTPXRequest
         
-        # Create custom request with longer timeout
+        # Pool sized for concurrently processed updates
         request = HTTPXRequest(
-            connection_pool_size=8,
+            connection_pool_size=32,
             connect_timeout=30.0,
             read_timeout=30.0,
             write_timeout=30.0,
             pool_timeout=30.0
         )
         
-        self.app = ApplicationBuilder().token(self.token).request(request).build()
+        # getUpdates long-polls, so its read timeout must outlast the poll timeout
+        poll_request = HTTPXRequest(
+            connection_pool_size=1,
+            connect_timeout=30.0,
+            read_timeout=40.0,
+            write_timeout=30.0,
+            pool_timeout=30.0
+        )
+        
+        self.app = (
+            ApplicationBuilder()
+            .token(self.token)
+            .request(request)
+            .get_updates_request(poll_request)
+            .concurrent_updates(True)
+            .build()
+        )
         
         # Add error handler
         self.app.add_error_handler(self.error_handler)
         
-        # Add handlers
-        self.app.add_handler(CommandHandler("start", self.start_command))
-        self.app.add_handler(CallbackQueryHandler(self.button_handler))
-        
-        # Add command handlers for settings
-        self.app.add_handler(CommandHandler("addsymbol", self.add_symbol_command))
-        self.app.add_handler(CommandHandler("removesymbol", self.remove_symbol_command))
-        self.app.add_handler(CommandHandler("listsymbols", self.list_symbols_command))
-        self.app.add_handler(CommandHandler("setcapital", self.set_capital_command))
+        # Add handlers in one group; block=False so slow handlers run concurrently
+        self.app.add_handlers({0: [
+            CommandHandler("start", self.start_command, block=False),
+            CallbackQueryHandler(self.button_handler, block=False),
+            CommandHandler("addsymbol", self.add_symbol_command, block=False),
+            CommandHandler("removesymbol", self.remove_symbol_command, block=False),
+            CommandHandler("listsymbols", self.list_symbols_command, block=False),
+            CommandHandler("setcapital", self.set_capital_command, block=False)
+        ]})
         
         # Start bot
         logger.info("Starting Realtime Telegram Bot")
         await self.app.initialize()
         await self.app.start()
-        await self.app.updater.start_polling(drop_pending_updates=True)
+        await self.app.updater.start_polling(
+            drop_pending_updates=True,
+            timeout=20,
+            poll_interval=0.0
+        )
+        
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._settings_lock = asyncio.Lock()
+        self._notify_q = asyncio.Queue()
+        self._notify_task = asyncio.create_task(self._notify_worker())
+        
+        # Stop promptly on SIGTERM (only possible from the main thread)
+        try:
+            self._loop.add_signal_handler(signal.SIGTERM, self._stop_event.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
         
-        # Keep running
+        # Keep running until stopped or cancelled
         try:
-            while True:
-                await asyncio.sleep(1)
+            await self._stop_event.wait()
         except asyncio.CancelledError:
             logger.info("Telegram bot stopping...")
         finally:
+            # Flush queued notifications before the bot goes away
+            self._notify_q.put_nowait(None)
+            await self._notify_task
+            self._notify_q = None
+            self._loop = None
+            
             await self.app.updater.stop()
             await self.app.stop()
             await self.app.shutdown()
     
+    async def stop(self):
+        """Stop the telegram bot started by start_async"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+    
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors"""
-        logger.error(f"Telegram error: {context.error}", exc_info=context.error)
+        logger.error("Telegram error: %s", context.error, exc_info=context.error)
         
         # Try to notify user
         try:
@@ -529,15 +761,33 @@ class RealtimeTelegramBot:
                     "⚠️ An error occurred. Please try again."
                 )
         except Exception as e:
-            logger.error(f"Could not send error message: {e}")
+            logger.error("Could not send error message: %s", e)
+    
+    def _change_symbols(self, method: str, *args):
+        """
+        Apply a symbol manager change and persist the new active symbols
+        
+        Runs in a worker thread so the whole change costs one thread hop;
+        callers hold _settings_lock.
+        
+        Returns:
+            (success, active_symbols) - active_symbols is None on failure
+        """
+        symbol_manager = self.bot_controller.symbol_manager
+        if not getattr(symbol_manager, method)(*args):
+            return False, None
+        
+        active_symbols = symbol_manager.get_active_symbols()
+        self.bot_controller.update_settings('active_symbols', active_symbols)
+        return True, active_symbols
     
     async def add_symbol_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /addsymbol command"""
         if not context.args or len(context.args) < 2:
             await update.message.reply_text(
-                "Usage: `/addsymbol SEGMENT SYMBOL`\n"
-                "Example: `/addsymbol NSE_FO NIFTY24JANFUT`",
-                parse_mode='Markdown'
+                "Usage: <code>/addsymbol SEGMENT SYMBOL</code>\n"
+                "Example: <code>/addsymbol NSE_FO NIFTY24JANFUT</code>",
+                parse_mode='HTML'
             )
             return
         
@@ -545,103 +795,102 @@ class RealtimeTelegramBot:
         symbol = context.args[1]
         
         # Add symbol via bot controller
-        success = self.bot_controller.symbol_manager.add_active_symbol(segment, symbol)
+        async with self._settings_lock:
+            success, active_symbols = await asyncio.to_thread(
+                self._change_symbols, 'add_active_symbol', segment, symbol
+            )
         
         if success:
-            # Update settings
-            active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
-            self.bot_controller.update_settings('active_symbols', active_symbols)
-            
             await update.message.reply_text(
-                f"✅ Added symbol: `{symbol}` from `{segment}`\n"
+                f"✅ Added symbol: <code>{_escape(symbol)}</code> from <code>{_escape(segment)}</code>\n"
                 f"Total active symbols: {len(active_symbols)}",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
         else:
             await update.message.reply_text(
-                f"❌ Failed to add symbol: `{symbol}`\n"
+                f"❌ Failed to add symbol: <code>{_escape(symbol)}</code>\n"
                 "Make sure the segment and symbol are correct.",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
     
     async def remove_symbol_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /removesymbol command"""
         if not context.args or len(context.args) < 1:
             await update.message.reply_text(
-                "Usage: `/removesymbol SYMBOL`\n"
-                "Example: `/removesymbol NIFTY24JANFUT`",
-                parse_mode='Markdown'
+                "Usage: <code>/removesymbol SYMBOL</code>\n"
+                "Example: <code>/removesymbol NIFTY24JANFUT</code>",
+                parse_mode='HTML'
             )
             return
         
         symbol = context.args[0]
         
         # Remove symbol
-        success = self.bot_controller.symbol_manager.remove_active_symbol(symbol)
+        async with self._settings_lock:
+            success, active_symbols = await asyncio.to_thread(
+                self._change_symbols, 'remove_active_symbol', symbol
+            )
         
         if success:
-            # Update settings
-            active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
-            self.bot_controller.update_settings('active_symbols', active_symbols)
-            
             await update.message.reply_text(
-                f"✅ Removed symbol: `{symbol}`\n"
+                f"✅ Removed symbol: <code>{_escape(symbol)}</code>\n"
                 f"Total active symbols: {len(active_symbols)}",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
         else:
             await update.message.reply_text(
-                f"❌ Symbol not found: `{symbol}`",
-                parse_mode='Markdown'
+                f"❌ Symbol not found: <code>{_escape(symbol)}</code>",
+                parse_mode='HTML'
             )
     
     async def list_symbols_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /listsymbols command - FIXED"""
-        active_symbols = self.bot_controller.symbol_manager.get_active_symbols()
+        active_symbols = await asyncio.to_thread(self.bot_controller.symbol_manager.get_active_symbols)
         
         if not active_symbols:
             await update.message.reply_text(
-                "📝 *Active Symbols*\n\n"
+                "📝 <b>Active Symbols</b>\n\n"
                 "No symbols configured yet.\n\n"
                 "Add symbols using:\n"
-                "`/addsymbol SEGMENT SYMBOL`",
-                parse_mode='Markdown'
+                "<code>/addsymbol SEGMENT SYMBOL</code>",
+                parse_mode='HTML'
             )
             return
         
-        message = "📝 *Active Symbols*\n\n"
+        lines = ["📝 <b>Active Symbols</b>\n"]
         for sym in active_symbols:
             # Handle both old and new symbol structure
-            lot_size = sym.get('lot_size') or sym.get('details', {}).get('lotsize', 'N/A')
-            token = sym.get('token') or sym.get('details', {}).get('token', 'N/A')
+            details = sym.get('details') or {}
+            lot_size = sym.get('lot_size') or details.get('lotsize', 'N/A')
+            token = sym.get('token') or details.get('token', 'N/A')
             
-            message += (
-                f"• `{sym['symbol']}` ({sym['segment']})\n"
-                f"  Lot Size: {lot_size}, Token: {token}\n"
+            lines.append(
+                f"• <code>{_escape(sym['symbol'])}</code> ({_escape(sym['segment'])})\n"
+                f"  Lot Size: {_escape(lot_size)}, Token: {_escape(token)}"
             )
         
-        await update.message.reply_text(message, parse_mode='Markdown')
+        await update.message.reply_text("\n".join(lines), parse_mode='HTML')
     
     async def set_capital_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setcapital command"""
         if not context.args or len(context.args) < 1:
             await update.message.reply_text(
-                "Usage: `/setcapital AMOUNT`\n"
-                "Example: `/setcapital 100000`",
-                parse_mode='Markdown'
+                "Usage: <code>/setcapital AMOUNT</code>\n"
+                "Example: <code>/setcapital 100000</code>",
+                parse_mode='HTML'
             )
             return
         
         try:
             capital = float(context.args[0])
-            self.bot_controller.update_settings('capital', capital)
+            await self._update('capital', capital)
             
             await update.message.reply_text(
                 f"✅ Capital set to: {format_number(capital)}",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
         except ValueError:
             await update.message.reply_text(
                 "❌ Invalid amount. Please provide a number.",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
\ No newline at end of file
@@ -3,54 +3,238 @@
 Common utility functions with separate bot settings support
 """
 
-import yaml
 import os
+import copy
+import math
+import time
+import json
+import tempfile
 from datetime import datetime
-import pytz
+from functools import lru_cache
 from typing import Dict, Any, List, Union
 from pathlib import Path
 
+# orjson reads/writes the JSON config sidecars several times faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@lru_cache(maxsize=1)
+def _yaml():
+    """
+    Import PyYAML on first use; warm starts read JSON sidecars and never need it
+    
+    Returns:
+        (yaml module, safe loader, safe dumper) - libyaml-backed when available
+    """
+    import yaml
+    try:
+        from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    except ImportError:
+        from yaml import SafeLoader, SafeDumper
+    return yaml, SafeLoader, SafeDumper
+
+# Config file locations (relative to the working directory)
+_SETTINGS_PATH = Path('config/settings.yaml')
+_SECRETS_PATH = Path('config/secrets.yaml')
+
+# file path -> (file stamp, parsed config, monotonic time of last check); the
+# cached dicts are shared by the internal readers, load_settings/load_secrets
+# hand out copies
+_SETTINGS_CACHE = {}
+_SECRETS_CACHE = {}
+
+# Config files are stat'ed for changes at most this often (seconds)
+_STAT_INTERVAL = 1.0
+
+def _file_stamp(path: Path):
+    """(mtime_ns, size) of a file; the size catches most rewrites on coarse-mtime filesystems"""
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+def _cached_config(cache: Dict, path: Path):
+    """
+    Get a previously parsed config if the file is unchanged since
+    
+    Within _STAT_INTERVAL of the last check the cached config is returned
+    without touching the file system. Writers in this process call
+    invalidate_settings_cache(), so only edits from elsewhere can take up
+    to _STAT_INTERVAL to be seen.
+    
+    Returns:
+        (stamp, config) - config is None on a cache miss
+    """
+    key = str(path)
+    cached = cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[2] < _STAT_INTERVAL:
+        return cached[0], cached[1]
+    
+    try:
+        stamp = _file_stamp(path)
+    except OSError:
+        return None, None
+    
+    if cached and cached[0] == stamp:
+        cache[key] = (stamp, cached[1], now)
+        return stamp, cached[1]
+    return stamp, None
+
+def _store_config(cache: Dict, path: Path, stamp, config: Dict[str, Any]):
+    """Remember a parsed config for _cached_config"""
+    cache[str(path)] = (stamp, config, time.monotonic())
+
+def invalidate_settings_cache():
+    """Forget the parsed settings (in memory and the JSON sidecar); call after writing settings.yaml"""
+    _SETTINGS_CACHE.pop(str(_SETTINGS_PATH), None)
+    try:
+        _SETTINGS_PATH.with_name(_SETTINGS_PATH.name + '.cache.json').unlink()
+    except OSError:
+        pass
+
+def _dump_sidecar(data: Any) -> bytes:
+    """Serialize parsed YAML for its JSON sidecar (TypeError if it would not round-trip)"""
+    if orjson is None:
+        return json.dumps(data).encode('utf-8')
+    # Passing dates through (unhandled) keeps YAML dates from coming back as strings
+    return orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+def _read_yaml(path: Path, sidecar: bool = True) -> Any:
+    """
+    Parse a YAML file, preferring an up-to-date JSON sidecar
+    
+    The sidecar (<name>.cache.json next to the YAML file) holds the parsed
+    YAML along with the (mtime_ns, size) of the file it was parsed from, and
+    is only used while the YAML file still has exactly that stamp.
+    
+    Args:
+        path: YAML file
+        sidecar: False to always parse the YAML and never write a copy
+                 (for files holding credentials)
+    """
+    if not sidecar:
+        yaml, loader, _ = _yaml()
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=loader)
+    
+    cache_path = path.with_name(path.name + '.cache.json')
+    stamp = list(_file_stamp(path))
+    
+    try:
+        with open(cache_path, 'rb') as f:
+            payload = f.read()
+        cached = orjson.loads(payload) if orjson else json.loads(payload)
+        if cached['source'] == stamp:
+            return cached['data']
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    
+    yaml, loader, _ = _yaml()
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=loader)
+    
+    tmp_path = None
+    try:
+        payload = _dump_sidecar({'source': stamp, 'data': data})
+        # Unique temp file + rename, so concurrent processes never read a partial sidecar
+        with tempfile.NamedTemporaryFile('wb', dir=cache_path.parent, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            f.write(payload)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    
+    return data
+
+# Environment flag values treated as enabled
+_TRUE_VALUES = frozenset({'true', '1', 'yes', 'on'})
+
+def _split_csv(value: str) -> List[str]:
+    """Split a comma separated environment value, empty or unset giving []"""
+    return value.split(',') if value else []
+
+def _remove_stale_sidecar(path: Path):
+    """Delete JSON copies of path written by earlier versions"""
+    for stale in (path.with_name(path.name + '.cache.json'), path.with_suffix('.json')):
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
 def load_secrets() -> Dict[str, Any]:
-    """Load secrets from environment variables or YAML file"""
+    """Load secrets from environment variables or YAML file (a private copy)"""
+    return copy.deepcopy(_load_secrets())
+
+# Environment variables the production secrets are built from
+_SECRET_ENV_VARS = (
+    'TELEGRAM_BACKTEST_TOKEN', 'TELEGRAM_BACKTEST_CHAT_IDS',
+    'TELEGRAM_REALTIME_TOKEN', 'TELEGRAM_REALTIME_CHAT_IDS',
+    'ANGELONE_API_KEY', 'ANGELONE_CLIENT_ID', 'ANGELONE_PASSWORD',
+    'ANGELONE_TOTP_SECRET', 'ANGELONE_ENABLED',
+    'ZERODHA_API_KEY', 'ZERODHA_API_SECRET', 'ZERODHA_ENABLED',
+)
+
+# (values of _SECRET_ENV_VARS, secrets dict built from them)
+_ENV_SECRETS = [None, None]
+
+def _load_secrets() -> Dict[str, Any]:
+    """Load secrets, returning the shared cached dict - callers must not modify it"""
     # Check for environment variables (production)
-    if os.getenv('TELEGRAM_REALTIME_TOKEN') or os.getenv('RAILWAY_ENVIRONMENT'):
-        return {
+    env = os.environ
+    if env.get('TELEGRAM_REALTIME_TOKEN') or env.get('RAILWAY_ENVIRONMENT'):
+        env_key = tuple(env.get(name) for name in _SECRET_ENV_VARS)
+        if _ENV_SECRETS[0] == env_key:
+            return _ENV_SECRETS[1]
+        
+        secrets = {
             'telegram': {
                 'backtest': {
-                    'bot_token': os.getenv('TELEGRAM_BACKTEST_TOKEN', ''),
-                    'chat_ids': os.getenv('TELEGRAM_BACKTEST_CHAT_IDS', '').split(',') if os.getenv('TELEGRAM_BACKTEST_CHAT_IDS') else []
+                    'bot_token': env.get('TELEGRAM_BACKTEST_TOKEN', ''),
+                    'chat_ids': _split_csv(env.get('TELEGRAM_BACKTEST_CHAT_IDS'))
                 },
                 'realtime': {
-                    'bot_token': os.getenv('TELEGRAM_REALTIME_TOKEN', ''),
-                    'chat_ids': os.getenv('TELEGRAM_REALTIME_CHAT_IDS', '').split(',') if os.getenv('TELEGRAM_REALTIME_CHAT_IDS') else []
+                    'bot_token': env.get('TELEGRAM_REALTIME_TOKEN', ''),
+                    'chat_ids': _split_csv(env.get('TELEGRAM_REALTIME_CHAT_IDS'))
                 }
             },
             'brokers': {
                 'angelone': {
-                    'api_key': os.getenv('ANGELONE_API_KEY', ''),
-                    'client_id': os.getenv('ANGELONE_CLIENT_ID', ''),
-                    'password': os.getenv('ANGELONE_PASSWORD', ''),
-                    'totp_secret': os.getenv('ANGELONE_TOTP_SECRET', ''),
-                    'enabled': os.getenv('ANGELONE_ENABLED', 'true').lower() == 'true'
+                    'api_key': env.get('ANGELONE_API_KEY', ''),
+                    'client_id': env.get('ANGELONE_CLIENT_ID', ''),
+                    'password': env.get('ANGELONE_PASSWORD', ''),
+                    'totp_secret': env.get('ANGELONE_TOTP_SECRET', ''),
+                    'enabled': env.get('ANGELONE_ENABLED', 'true').lower() in _TRUE_VALUES
                 },
                 'zerodha': {
-                    'api_key': os.getenv('ZERODHA_API_KEY', ''),
-                    'api_secret': os.getenv('ZERODHA_API_SECRET', ''),
-                    'enabled': os.getenv('ZERODHA_ENABLED', 'false').lower() == 'true'
+                    'api_key': env.get('ZERODHA_API_KEY', ''),
+                    'api_secret': env.get('ZERODHA_API_SECRET', ''),
+                    'enabled': env.get('ZERODHA_ENABLED', 'false').lower() in _TRUE_VALUES
                 }
             }
         }
+        _ENV_SECRETS[:] = [env_key, secrets]
+        return secrets
     
     # Local development - use YAML
+    secrets_file = _SECRETS_PATH
+    stamp, cached = _cached_config(_SECRETS_CACHE, secrets_file)
+    if cached is not None:
+        return cached
+    
     try:
-        secrets_file = Path('config/secrets.yaml')
-        if not secrets_file.exists():
+        if not secrets_file.is_file():
             print("⚠️ config/secrets.yaml not found. Creating template...")
             create_secrets_template()
             return get_default_secrets()
         
-        with open(secrets_file, 'r', encoding='utf-8') as f:
-            secrets = yaml.safe_load(f)
+        # Never cached to disk - a sidecar would be a second plaintext copy of the tokens
+        secrets = _read_yaml(secrets_file, sidecar=False)
+        _remove_stale_sidecar(secrets_file)
         
         # Normalize chat_id/chat_ids format
         for bot_type in ['backtest', 'realtime']:
@@ -61,6 +245,8 @@ def load_secrets() -> Dict[str, Any]:
                 elif 'chat_ids' in tg_config and isinstance(tg_config['chat_ids'], str):
                     tg_config['chat_ids'] = [tg_config['chat_ids']]
         
+        if stamp is not None:
+            _store_config(_SECRETS_CACHE, secrets_file, stamp, secrets)
         return secrets
         
     except Exception as e:
@@ -110,115 +296,203 @@ brokers:
 """
     
     os.makedirs('config', exist_ok=True)
-    with open('config/secrets.yaml', 'w', encoding='utf-8') as f:
+    with open(_SECRETS_PATH, 'w', encoding='utf-8') as f:
         f.write(template)
     print("✅ Created config/secrets.yaml template")
 
-def load_settings() -> Dict[str, Any]:
-    """Load settings with separate bot configurations"""
-    default_config = {
-        'timezone': 'Asia/Kolkata',
-        'backtest_bot': {
-            'schedule': {
-                'start_time': '06:00',
-                'end_time': '12:00',
-                'all_days': True
-            },
-            'session_duration_months': 4,
-            'start_date': '2010-01-01',
-            'trading': {
-                'broker': 'angelone',
-                'segment': 'NSE_FO',
-                'capital': 100000,
-                'risk_per_trade': 2.0,
-                'max_trades': 5,
-                'mode': 'paper',
-                'active_strategies': ['5EMA_PowerOfStocks'],
-                'active_symbols': []
-            }
-        },
-        'realtime_bot': {
-            'schedule': {
-                'start_time': '08:55',
-                'end_time': '16:05',
-                'weekdays_only': True
-            },
-            'ltp_update_interval': 600,
-            'trading': {
-                'broker': 'angelone',
-                'segment': 'NSE_FO',
-                'capital': 100000,
-                'risk_per_trade': 2.0,
-                'max_trades': 5,
-                'mode': 'paper',
-                'active_strategies': ['5EMA_PowerOfStocks'],
-                'active_symbols': []
-            }
-        },
-        'logging': {
-            'retention_days': 15,
-            'level': 'DEBUG',
-            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Built-in settings; loaded settings.yaml values are merged over a copy
+_DEFAULT_CONFIG = {
+    'timezone': 'Asia/Kolkata',
+    'backtest_bot': {
+        'schedule': {
+            'start_time': '06:00',
+            'end_time': '12:00',
+            'all_days': True
         },
-        'paths': {
-            'master_lists': 'data/master_lists',
-            'historical_data': 'data/historical',
-            'backtest_state': 'data/backtest_state',
-            'logs_backtest': 'logs/backtest',
-            'logs_realtime': 'logs/realtime',
-            'trades_backtest': 'trades/backtest_trades.csv',
-            'trades_realtime': 'trades/realtime_trades.csv'
+        'session_duration_months': 4,
+        'start_date': '2010-01-01',
+        'trading': {
+            'broker': 'angelone',
+            'segment': 'NSE_FO',
+            'capital': 100000,
+            'risk_per_trade': 2.0,
+            'max_trades': 5,
+            'mode': 'paper',
+            'active_strategies': ['5EMA_PowerOfStocks'],
+            'active_symbols': []
+        }
+    },
+    'realtime_bot': {
+        'schedule': {
+            'start_time': '08:55',
+            'end_time': '16:05',
+            'weekdays_only': True
         },
-        'segments': ['NSE_EQ', 'NSE_FO', 'BSE_EQ', 'MCX_FO', 'CDS_FO'],
-        'default_settings': {
+        'ltp_update_interval': 600,
+        'trading': {
             'broker': 'angelone',
             'segment': 'NSE_FO',
             'capital': 100000,
             'risk_per_trade': 2.0,
             'max_trades': 5,
             'mode': 'paper',
-            'active_strategies': [],
+            'active_strategies': ['5EMA_PowerOfStocks'],
             'active_symbols': []
         }
+    },
+    'logging': {
+        'retention_days': 15,
+        'level': 'DEBUG',
+        'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    },
+    'paths': {
+        'master_lists': 'data/master_lists',
+        'historical_data': 'data/historical',
+        'backtest_state': 'data/backtest_state',
+        'logs_backtest': 'logs/backtest',
+        'logs_realtime': 'logs/realtime',
+        'trades_backtest': 'trades/backtest_trades.csv',
+        'trades_realtime': 'trades/realtime_trades.csv'
+    },
+    'segments': ['NSE_EQ', 'NSE_FO', 'BSE_EQ', 'MCX_FO', 'CDS_FO'],
+    'default_settings': {
+        'broker': 'angelone',
+        'segment': 'NSE_FO',
+        'capital': 100000,
+        'risk_per_trade': 2.0,
+        'max_trades': 5,
+        'mode': 'paper',
+        'active_strategies': [],
+        'active_symbols': []
     }
+}
+
+def load_settings() -> Dict[str, Any]:
+    """Load settings with separate bot configurations (a private copy)"""
+    return copy.deepcopy(_load_settings())
+
+def _load_settings() -> Dict[str, Any]:
+    """Load settings, returning the shared cached dict - callers must not modify it"""
+    settings_file = _SETTINGS_PATH
+    stamp, cached = _cached_config(_SETTINGS_CACHE, settings_file)
+    if cached is not None:
+        return cached
     
     try:
-        settings_file = Path('config/settings.yaml')
-        
-        if not settings_file.exists():
+        if not settings_file.is_file():
             print("⚠️ config/settings.yaml not found. Creating...")
+            default_config = copy.deepcopy(_DEFAULT_CONFIG)
             create_settings_file(default_config)
+            
+            # The file now holds exactly these defaults; skip re-parsing it next time
+            _store_config(_SETTINGS_CACHE, settings_file, _file_stamp(settings_file), default_config)
             return default_config
         
-        with open(settings_file, 'r', encoding='utf-8') as f:
-            loaded_config = yaml.safe_load(f)
+        loaded_config = _read_yaml(settings_file)
         
-        if not loaded_config:
-            return default_config
+        if loaded_config:
+            merged_config = merge_configs(_DEFAULT_CONFIG, loaded_config)
+        else:
+            merged_config = copy.deepcopy(_DEFAULT_CONFIG)
         
-        return merge_configs(default_config, loaded_config)
+        if stamp is not None:
+            _store_config(_SETTINGS_CACHE, settings_file, stamp, merged_config)
+        return merged_config
         
     except Exception as e:
         print(f"❌ Error loading settings.yaml: {e}")
-        return default_config
+        return copy.deepcopy(_DEFAULT_CONFIG)
+
+def _time_to_seconds(value: Union[str, int]) -> int:
+    """
+    Convert an 'HH:MM' schedule time to seconds since midnight
+    
+    Unquoted HH:MM values are read by YAML 1.1 as base-60 integers, i.e.
+    minutes since midnight, so integers are taken as minutes.
+    """
+    if isinstance(value, int):
+        return value * 60
+    hours, minutes = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+def _compile_schedules(config: Dict[str, Any]) -> Dict[str, tuple]:
+    """
+    Precompute each bot's schedule as seconds since midnight
+    
+    Returns bot key -> (start, end, weekdays_only). The schedule is resolved like get_bot_settings does, so a schedule saved
+    under trading wins. Bots without a valid schedule are left out.
+    """
+    schedules = {}
+    for key, section in config.items():
+        if not key.endswith('_bot') or not isinstance(section, dict):
+            continue
+        
+        trading = section.get('trading')
+        if isinstance(trading, dict) and 'schedule' in trading:
+            schedule = trading['schedule']
+        else:
+            schedule = section.get('schedule')
+        if schedule is None:
+            continue
+        
+        try:
+            schedules[key] = (
+                _time_to_seconds(schedule['start_time']),
+                _time_to_seconds(schedule['end_time']),
+                bool(schedule.get('weekdays_only', False))
+            )
+        except Exception as e:
+            print(f"❌ Invalid {key} schedule: {e}")
+    
+    return schedules
+
+# settings file path -> (file stamp, compiled schedules), rebuilt when the settings are
+_SCHEDULES_CACHE = {}
+
+def _get_schedules(settings: Dict[str, Any]) -> Dict[str, tuple]:
+    """
+    Get the compiled schedules for settings returned by _load_settings
+    
+    Compiled once per version of settings.yaml; settings that did not come
+    from the cache (defaults after a load error) are compiled every time.
+    """
+    key = str(_SETTINGS_PATH)
+    entry = _SETTINGS_CACHE.get(key)
+    if entry is None or entry[1] is not settings:
+        return _compile_schedules(settings)
+    
+    stamp = entry[0]
+    cached = _SCHEDULES_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    
+    schedules = _compile_schedules(settings)
+    _SCHEDULES_CACHE[key] = (stamp, schedules)
+    return schedules
 
 def merge_configs(default: Dict, loaded: Dict) -> Dict:
     """Deep merge configurations"""
-    result = default.copy()
+    result = copy.deepcopy(default)
     
-    for key, value in loaded.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = merge_configs(result[key], value)
-        else:
-            result[key] = value
+    # Walk nested dicts with an explicit stack, merging into result in place
+    stack = [(result, loaded)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            current = target.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                stack.append((current, value))
+            else:
+                target[key] = value
     
     return result
 
 def create_settings_file(config: Dict[str, Any]):
     """Create settings.yaml"""
+    yaml, _, dumper = _yaml()
     os.makedirs('config', exist_ok=True)
-    with open('config/settings.yaml', 'w', encoding='utf-8') as f:
-        yaml.safe_dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    with open(_SETTINGS_PATH, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, Dumper=dumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
     print("✅ Created config/settings.yaml")
 
 def get_bot_settings(bot_type: str) -> Dict[str, Any]:
@@ -231,12 +505,12 @@ def get_bot_settings(bot_type: str) -> Dict[str, Any]:
     Returns:
         Bot-specific settings dictionary
     """
-    settings = load_settings()
+    settings = _load_settings()
     bot_key = f'{bot_type}_bot'
     
     if bot_key in settings:
-        # Return separate bot settings
-        bot_settings = settings[bot_key].copy()
+        # Return separate bot settings (a deep copy, the loaded settings are cached)
+        bot_settings = copy.deepcopy(settings[bot_key])
         
         # Merge in trading settings as top-level for backward compatibility
         if 'trading' in bot_settings:
@@ -246,84 +520,137 @@ def get_bot_settings(bot_type: str) -> Dict[str, Any]:
         return bot_settings
     else:
         # Fallback to default_settings
-        return settings.get('default_settings', {})
+        return copy.deepcopy(settings.get('default_settings', {}))
 
-def get_ist_time() -> datetime:
-    """Get current time in IST"""
-    settings = load_settings()
-    tz = pytz.timezone(settings.get('timezone', 'Asia/Kolkata'))
+@lru_cache(maxsize=8)
+def _get_timezone(name: str):
+    """
+    Get a timezone, resolved once per name
+    
+    Uses the stdlib zoneinfo; pytz covers systems without a tz database
+    (e.g. Windows without the tzdata package).
+    """
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except (ImportError, KeyError):
+        import pytz
+        return pytz.timezone(name)
+
+def get_ist_time(settings: Dict[str, Any] = None) -> datetime:
+    """
+    Get current time in IST
+    
+    Args:
+        settings: Already loaded settings, to avoid loading them again
+    """
+    if settings is None:
+        settings = _load_settings()
+    tz = _get_timezone(settings.get('timezone', 'Asia/Kolkata'))
     return datetime.now(tz)
 
+# bot_type -> (monotonic time checked, result); market hours only flip at boundaries
+_MARKET_HOURS_CACHE = {}
+_MARKET_HOURS_TTL = 30.0
+
 def is_market_hours(bot_type: str = "realtime") -> bool:
-    """Check if within market hours for specific bot"""
-    bot_settings = get_bot_settings(bot_type)
-    current_time = get_ist_time()
+    """Check if within market hours for specific bot (cached for up to 30s)"""
+    now = time.monotonic()
+    cached = _MARKET_HOURS_CACHE.get(bot_type)
+    if cached and now - cached[0] < _MARKET_HOURS_TTL:
+        return cached[1]
     
-    try:
-        if 'schedule' not in bot_settings:
-            return True
-        
-        schedule = bot_settings['schedule']
-        
-        # Check weekday restriction (only for realtime)
-        if schedule.get('weekdays_only', False) and current_time.weekday() >= 5:
-            return False
-        
-        start_time = datetime.strptime(schedule['start_time'], '%H:%M').time()
-        end_time = datetime.strptime(schedule['end_time'], '%H:%M').time()
-        current = current_time.time()
-        
-        return start_time <= current <= end_time
-    except Exception as e:
-        print(f"❌ Error checking market hours: {e}")
+    result = _check_market_hours(bot_type)
+    _MARKET_HOURS_CACHE[bot_type] = (now, result)
+    return result
+
+def _check_market_hours(bot_type: str) -> bool:
+    """Evaluate market hours for a bot against its schedule"""
+    settings = _load_settings()
+    
+    # Bounds are converted to seconds since midnight once per settings version
+    schedule = _get_schedules(settings).get(f'{bot_type}_bot')
+    if schedule is None:
         return True
+    
+    start, end, weekdays_only = schedule
+    current_time = get_ist_time(settings)
+    
+    # Check weekday restriction (only for realtime)
+    if weekdays_only and current_time.weekday() >= 5:
+        return False
+    
+    current = current_time.hour * 3600 + current_time.minute * 60 + current_time.second
+    return start <= current <= end
 
 def calculate_quantity(capital: float, risk_percent: float, 
                        price: float, stop_loss: float, 
                        lot_size: int = 1) -> int:
     """Calculate position quantity based on risk"""
-    try:
-        risk_per_unit = abs(price - stop_loss)
-        
-        if risk_per_unit <= 0:
-            return lot_size
-        
-        risk_amount = capital * (risk_percent / 100)
-        max_quantity = int(risk_amount / risk_per_unit)
-        
-        if max_quantity < lot_size:
-            return lot_size
-        
-        lots = max_quantity // lot_size
-        return max(1, lots) * lot_size
-        
-    except Exception as e:
-        print(f"❌ Error calculating quantity: {e}")
+    risk_per_unit = abs(price - stop_loss)
+    
+    # "not > 0" also rejects NaN
+    if not risk_per_unit > 0 or lot_size <= 0:
+        return lot_size
+    
+    risk_amount = capital * (risk_percent / 100)
+    max_quantity = risk_amount / risk_per_unit
+    
+    if not lot_size <= max_quantity < math.inf:
         return lot_size
+    
+    lots = int(max_quantity) // lot_size
+    return max(1, lots) * lot_size
+
+@lru_cache(maxsize=4096)
+def _format_amount(num: float, decimals: int) -> str:
+    """Format with thousands separators, memoized for repeated amounts
+    
+    The cache treats -0.0 and 0.0 as the same key, so callers pass num + 0.0
+    (which turns -0.0 into 0.0) to keep a cached "-0.00" from leaking out.
+    """
+    return format(num, f",.{decimals}f")
+
+# sign of the PnL -> prefix
+_PNL_PREFIX = {1: "🟢 +₹", -1: "🔴 ₹", 0: "⚪ ₹"}
 
 def format_pnl(pnl: float) -> str:
     """Format PnL with emoji"""
-    try:
-        if pnl > 0:
-            return f"🟢 +₹{pnl:,.2f}"
-        elif pnl < 0:
-            return f"🔴 ₹{pnl:,.2f}"
-        else:
-            return f"⚪ ₹{pnl:,.2f}"
-    except:
-        return "⚪ ₹0.00"
+    return _PNL_PREFIX[(pnl > 0) - (pnl < 0)] + _format_amount(pnl + 0.0, 2)
 
 def format_number(num: float, decimals: int = 2) -> str:
     """Format number with rupee symbol"""
+    return "₹" + _format_amount(num + 0.0, decimals)
+
+# bot_type -> (secrets dict the set was built from, frozenset of chat id strings)
+_AUTH_IDS = {}
+
+def get_authorized_id_set(bot_type: str = 'realtime') -> frozenset:
+    """
+    Get authorized chat IDs as a frozenset
+    
+    _load_secrets hands back the same cached dict until secrets.yaml (or, in
+    production, the secret environment variables) changes, so the set is only
+    rebuilt when the secrets do.
+    """
     try:
-        return f"₹{num:,.{decimals}f}"
+        secrets = _load_secrets()
     except:
-        return "₹0.00"
+        return frozenset()
+    
+    cached = _AUTH_IDS.get(bot_type)
+    if cached and cached[0] is secrets:
+        return cached[1]
+    
+    chat_ids = secrets.get('telegram', {}).get(bot_type, {}).get('chat_ids', [])
+    auth_ids = frozenset(str(cid) for cid in chat_ids)
+    _AUTH_IDS[bot_type] = (secrets, auth_ids)
+    return auth_ids
 
 def get_authorized_chat_ids(bot_type: str = 'realtime') -> List[str]:
     """Get authorized chat IDs for a bot"""
     try:
-        secrets = load_secrets()
+        secrets = _load_secrets()
         tg_config = secrets.get('telegram', {}).get(bot_type, {})
         chat_ids = tg_config.get('chat_ids', [])
         return [str(cid) for cid in chat_ids]
@@ -332,23 +659,26 @@ def get_authorized_chat_ids(bot_type: str = 'realtime') -> List[str]:
 
 def is_authorized_user(chat_id: Union[str, int], bot_type: str = 'realtime') -> bool:
     """Check if chat ID is authorized"""
-    authorized_ids = get_authorized_chat_ids(bot_type)
-    return str(chat_id) in authorized_ids
+    return str(chat_id) in get_authorized_id_set(bot_type)
+
+# Directories the bots write into (relative to the working directory)
+_REQUIRED_DIRECTORIES = (
+    'config',
+    'data/master_lists',
+    'data/historical',
+    'data/backtest_state',
+    'logs/backtest',
+    'logs/realtime',
+    'trades'
+)
 
 def ensure_directories():
-    """Create all required directories"""
-    directories = [
-        'config',
-        'data/master_lists',
-        'data/historical',
-        'data/backtest_state',
-        'logs/backtest',
-        'logs/realtime',
-        'trades'
-    ]
-    
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
-
-# Initialize on import
-ensure_directories()
\ No newline at end of file
+    """
+    Create all required directories
+    
+    Each directory is checked with a single stat, and only missing ones are
+    created, so directories deleted since the last run are recreated.
+    """
+    for directory in _REQUIRED_DIRECTORIES:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
\ No newline at end of file
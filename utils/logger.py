@@ -9,6 +9,9 @@ from pathlib import Path
 from datetime import datetime, timedelta
 import os
 
+# (bot type, date) pairs whose log directory was already cleaned up
+_CLEANED = set()
+
 def setup_logger(name: str, bot_type: str = "backtest", level: str = "INFO") -> logging.Logger:
     """
     Setup logger with file and console handlers
@@ -21,19 +24,29 @@ def setup_logger(name: str, bot_type: str = "backtest", level: str = "INFO") ->
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level))
     
+    # Log file path with date
+    log_dir = Path(f"logs/{bot_type}")
+    today = datetime.now().strftime('%Y-%m-%d')
+    log_file = log_dir / f"{today}.log"
+    
+    # Already set up with today's log file - keep the existing handlers
+    log_path = os.path.abspath(log_file)
+    for handler in logger.handlers:
+        if getattr(handler, '_algo_owned', False) and handler.baseFilename == log_path:
+            return logger
+    
     # Remove existing handlers
+    for handler in logger.handlers:
+        handler.close()
     logger.handlers.clear()
     
     # Create logs directory
-    log_dir = Path(f"logs/{bot_type}")
     log_dir.mkdir(parents=True, exist_ok=True)
     
-    # Log file path with date
-    log_file = log_dir / f"{datetime.now().strftime('%Y-%m-%d')}.log"
-    
     # File handler with UTF-8 encoding
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
     file_handler.setLevel(logging.DEBUG)
+    file_handler._algo_owned = True
     
     # Console handler with UTF-8 encoding
     console_handler = logging.StreamHandler(sys.stdout)
@@ -59,8 +72,10 @@ def setup_logger(name: str, bot_type: str = "backtest", level: str = "INFO") ->
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
     
-    # Cleanup old logs
-    cleanup_old_logs(log_dir, retention_days=15)
+    # Cleanup old logs, once per directory per day
+    if (bot_type, today) not in _CLEANED:
+        _CLEANED.add((bot_type, today))
+        cleanup_old_logs(log_dir, retention_days=15)
     
     return logger
 
@@ -74,12 +89,14 @@ def cleanup_old_logs(log_dir: Path, retention_days: int = 15):
         retention_days: Number of days to keep logs
     """
     try:
-        cutoff_date = datetime.now() - timedelta(days=retention_days)
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%d')
         
-        for log_file in log_dir.glob("*.log"):
-            file_date = datetime.strptime(log_file.stem, '%Y-%m-%d')
-            if file_date < cutoff_date:
-                log_file.unlink()
+        # Log files are named YYYY-MM-DD.log, so their dates compare as strings
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if len(name) == 14 and name.endswith('.log') and name[:10] <= cutoff:
+                    os.unlink(entry.path)
                 
     except Exception as e:
         # Don't fail if cleanup fails
@@ -3,16 +3,24 @@
 CSV Trade Logger for recording all trades
 """
 
+import atexit
 import csv
+import io
 import os
+import weakref
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
-import yaml
+from utils.helpers import load_settings
 
-def load_settings():
-    with open('config/settings.yaml', 'r') as f:
-        return yaml.safe_load(f)
+# Loggers with an open CSV, closed together at exit
+_OPEN_LOGGERS = weakref.WeakSet()
+
+@atexit.register
+def _close_all():
+    """Close the CSV files of all trade loggers still open"""
+    for trade_logger in list(_OPEN_LOGGERS):
+        trade_logger.close()
 
 class TradeLogger:
     """Log trades to CSV file"""
@@ -38,18 +46,25 @@ class TradeLogger:
         else:
             self.csv_file = settings['paths']['trades_realtime']
         
-        # Create trades directory if it doesn't exist
-        Path(self.csv_file).parent.mkdir(parents=True, exist_ok=True)
-        
-        # Create CSV with headers if it doesn't exist
-        if not os.path.exists(self.csv_file):
-            self._create_csv()
+        # CSV file and writer, opened on the first logged trade
+        self._fh = None
+        self._writer = None
     
-    def _create_csv(self):
-        """Create CSV file with headers"""
-        with open(self.csv_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.HEADERS)
-            writer.writeheader()
+    def _open(self):
+        """Open the CSV for appends, creating it with headers if needed"""
+        # Line buffered so every trade reaches the file
+        try:
+            self._fh = open(self.csv_file, 'a', newline='', buffering=1)
+        except FileNotFoundError:
+            # Create trades directory if it doesn't exist
+            Path(self.csv_file).parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.csv_file, 'a', newline='', buffering=1)
+        self._writer = csv.writer(self._fh)
+        _OPEN_LOGGERS.add(self)
+        
+        # New CSV - write the headers
+        if self._fh.tell() == 0:
+            self._writer.writerow(self.HEADERS)
     
     def log_trade(self, trade_data: Dict[str, Any]):
         """
@@ -60,31 +75,38 @@ class TradeLogger:
         """
         now = datetime.now()
         
-        # Prepare trade record
-        record = {
-            'timestamp': now.isoformat(),
-            'date': now.strftime('%Y-%m-%d'),
-            'time': now.strftime('%H:%M:%S'),
-            'symbol': trade_data.get('symbol', ''),
-            'segment': trade_data.get('segment', ''),
-            'strategy': trade_data.get('strategy', ''),
-            'action': trade_data.get('action', ''),  # BUY/SELL
-            'order_type': trade_data.get('order_type', ''),  # MARKET/LIMIT
-            'quantity': trade_data.get('quantity', 0),
-            'price': trade_data.get('price', 0.0),
-            'broker': trade_data.get('broker', ''),
-            'mode': trade_data.get('mode', ''),  # paper/live
-            'order_id': trade_data.get('order_id', ''),
-            'status': trade_data.get('status', ''),  # SUCCESS/FAILED
-            'pnl': trade_data.get('pnl', 0.0),
-            'capital': trade_data.get('capital', 0.0),
-            'remarks': trade_data.get('remarks', '')
-        }
+        # Prepare trade record (in HEADERS order)
+        record = (
+            now.isoformat(),
+            now.strftime('%Y-%m-%d'),
+            now.strftime('%H:%M:%S'),
+            trade_data.get('symbol', ''),
+            trade_data.get('segment', ''),
+            trade_data.get('strategy', ''),
+            trade_data.get('action', ''),  # BUY/SELL
+            trade_data.get('order_type', ''),  # MARKET/LIMIT
+            trade_data.get('quantity', 0),
+            trade_data.get('price', 0.0),
+            trade_data.get('broker', ''),
+            trade_data.get('mode', ''),  # paper/live
+            trade_data.get('order_id', ''),
+            trade_data.get('status', ''),  # SUCCESS/FAILED
+            trade_data.get('pnl', 0.0),
+            trade_data.get('capital', 0.0),
+            trade_data.get('remarks', '')
+        )
         
         # Append to CSV
-        with open(self.csv_file, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.HEADERS)
-            writer.writerow(record)
+        if self._writer is None:
+            self._open()
+        self._writer.writerow(record)
+    
+    def close(self):
+        """Close the CSV file; safe to call more than once"""
+        fh, self._fh, self._writer = self._fh, None, None
+        _OPEN_LOGGERS.discard(self)
+        if fh is not None:
+            fh.close()
     
     def get_recent_trades(self, limit: int = 10) -> list:
         """
@@ -96,12 +118,41 @@ class TradeLogger:
         Returns:
             List of trade dictionaries
         """
-        if not os.path.exists(self.csv_file):
+        if limit <= 0 or not os.path.exists(self.csv_file):
             return []
         
-        trades = []
-        with open(self.csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            trades = list(reader)
+        # Parse a growing tail of the file until it holds the last `limit`
+        # complete records; quoted fields may span lines, so rows are not lines
+        with open(self.csv_file, 'rb') as f:
+            header = f.readline()
+            data_start = f.tell()
+            end = f.seek(0, os.SEEK_END)
+            
+            fieldnames = next(csv.reader([header.decode('utf-8', 'replace')]), None)
+            if not fieldnames:
+                return []
+            
+            block = 8192
+            while True:
+                start = max(data_start, end - block)
+                f.seek(start)
+                trades = self._parse_rows(f.read(end - start), fieldnames)
+                if start == data_start:
+                    break
+                
+                # The first record may start mid-row; the rest are trusted once
+                # enough of them parse to the header's width
+                trades = trades[1:]
+                recent = trades[-limit:]
+                if len(recent) == limit and all(None not in t and None not in t.values() for t in recent):
+                    break
+                block *= 4
         
-        return trades[-limit:] if trades else []
\ No newline at end of file
+        return trades[-limit:]
+    
+    @staticmethod
+    def _parse_rows(data: bytes, fieldnames: list) -> list:
+        """Parse CSV rows (without header) into dicts keyed by fieldnames"""
+        # Same default encoding as the writer; a character cut at the block start is replaced
+        text = io.TextIOWrapper(io.BytesIO(data), newline='', errors='replace')
+        return list(csv.DictReader(text, fieldnames=fieldnames))
\ No newline at end of file